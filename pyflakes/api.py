@@ -2,20 +2,48 @@
 API for the command-line I{pyflakes} tool.
 """
 import ast
+import collections
+import fnmatch
+import functools
 import os
 import platform
 import re
 import sys
+import time
 
 from pyflakes import checker, __version__
 from pyflakes import reporter as modReporter
 
-__all__ = ['check', 'checkPath', 'checkRecursive', 'iterSourceCode', 'main']
+__all__ = ['check', 'checkMany', 'CheckResult', 'checkPath', 'checkRecursive',
+           'iterSourceCode', 'iterChangedSourceCode', 'gitChanges', 'watch',
+           'main']
 
 PYTHON_SHEBANG_REGEX = re.compile(br'^#!.*\bpython(3(\.\d+)?|w)?[dmu]?\s')
 
+# Extensions of file formats which cannot start with a shebang line, so
+# there is no point in opening such files to look for one.
+NON_PYTHON_EXTENSIONS = frozenset((
+    '.pyc', '.pyo', '.pyd', '.so', '.dylib', '.dll', '.exe', '.o', '.a',
+    '.obj', '.lib', '.class', '.jar', '.whl', '.egg', '.zip', '.gz', '.tgz',
+    '.bz2', '.xz', '.zst', '.7z', '.png', '.jpg', '.jpeg', '.gif', '.bmp',
+    '.ico', '.webp', '.pdf', '.woff', '.woff2', '.ttf', '.otf', '.mo',
+    '.json', '.npy', '.npz', '.mp3', '.mp4', '.wav', '.ogg',
+))
 
-def check(codeString, filename, reporter=None):
+# How files without a .py extension can be recognised as Python files by
+# their shebang line: by reading all of them, only those looking like
+# scripts (no extension, or executable), or none of them.
+SHEBANG_MODES = ('all', 'scripts', 'none')
+
+# Directories the command-line tool skips unless told otherwise.
+DEFAULT_EXCLUDE = ('.svn', 'CVS', '.bzr', '.hg', '.git', '__pycache__')
+
+# The default of --cache-max-size, in bytes.  pyflakes.cache is only imported
+# when there is a cache, so this mirrors its DEFAULT_MAX_SIZE.
+DEFAULT_CACHE_MAX_SIZE = 100 * 1024 * 1024
+
+
+def check(codeString, filename, reporter=None, timeout=None):
     """
     Check the Python source given by C{codeString} for flakes.
 
@@ -29,11 +57,31 @@ def check(codeString, filename, reporter=None):
     @param reporter: A L{Reporter} instance, where errors and warnings will be
         reported.
 
+    @param timeout: C{None}, or the number of seconds after which to give up
+        checking the parsed source.  This is reported as an unexpected error,
+        but does not count as a warning.
+
     @return: The number of warnings emitted.
     @rtype: C{int}
     """
     if reporter is None:
         reporter = modReporter._makeDefaultReporter()
+    try:
+        return _check(codeString, filename, reporter, timeout)
+    except checker.CheckTimeout:
+        _reportTimeout(reporter, filename, timeout)
+        return 0
+
+
+def _reportTimeout(reporter, filename, timeout):
+    reporter.unexpectedError(
+        filename, f'skipped, checking took longer than {timeout} seconds')
+
+
+def _check(codeString, filename, reporter, timeout):
+    """
+    Like L{check}, but let L{checker.CheckTimeout} through.
+    """
     # First, compile into an AST and handle syntax errors.
     try:
         tree = ast.parse(codeString, filename=filename)
@@ -44,19 +92,84 @@ def check(codeString, filename, reporter=None):
         reporter.unexpectedError(filename, 'problem decoding source')
         return 1
     # Okay, it's syntactically valid.  Now check it.
-    w = checker.Checker(tree, filename=filename)
+    w = checker.Checker(tree, filename=filename, timeout=timeout)
     w.messages.sort(key=lambda m: m.lineno)
     for warning in w.messages:
         reporter.flake(warning)
     return len(w.messages)
 
 
-def checkPath(filename, reporter=None):
+CheckResult = collections.namedtuple(
+    'CheckResult', ['filename', 'messages', 'syntaxError', 'error', 'time'])
+CheckResult.__doc__ = """
+The result of checking one source with L{checkMany}.
+
+@ivar filename: The name the source was given.
+@ivar messages: The L{pyflakes.messages.Message}s found, sorted by line.
+@ivar syntaxError: C{None}, or the C{(msg, lineno, offset, text)} arguments
+    of L{pyflakes.reporter.Reporter.syntaxError} if the source could not be
+    parsed.
+@ivar error: C{None}, or a message explaining why the source could not be
+    processed otherwise.
+@ivar time: The time spent checking the source, in seconds.
+"""
+
+
+def _checkSource(item):
+    """
+    Check the C{(codeString, filename)} pair C{item}.
+
+    @return: A L{CheckResult}.
+    """
+    codeString, filename = item
+    recorder = modReporter._RecordingReporter()
+    start = time.perf_counter()
+    check(codeString, filename, recorder)
+    elapsed = time.perf_counter() - start
+
+    messages = []
+    syntaxError = error = None
+    for method, *args in recorder.log:
+        if method == 'flake':
+            messages.append(args[0])
+        elif method == 'syntaxError':
+            syntaxError = tuple(args[1:])
+        else:
+            error = args[1]
+    return CheckResult(filename, messages, syntaxError, error, elapsed)
+
+
+def checkMany(sources, jobs=1):
+    """
+    Check many Python sources, without going through a reporter.
+
+    @param sources: An iterable of C{(codeString, filename)} pairs, as would
+        be passed to L{check}.  It is consumed lazily.
+    @param jobs: The number of processes to check sources with.  C{None} or
+        less than 1 means one per CPU.
+    @return: An iterator of L{CheckResult}s, in the order of C{sources}.
+    """
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+    if jobs == 1:
+        return map(_checkSource, sources)
+    return _parallelMap(_checkSource, sources, jobs)
+
+
+def checkPath(filename, reporter=None, cache=None, maxSize=None,
+              timeout=None):
     """
     Check the given path, printing out any warnings detected.
 
     @param reporter: A L{Reporter} instance, where errors and warnings will be
         reported.
+    @param cache: A L{pyflakes.cache.ResultCache} to look the results up in
+        before checking, and to store them in after, or C{None}.
+    @param maxSize: C{None}, or the size in bytes above which the file is
+        skipped.  This is reported as an unexpected error, but does not count
+        as a warning.
+    @param timeout: C{None}, or the number of seconds after which to give up
+        checking the file, see L{check}.
 
     @return: the number of warnings printed
     """
@@ -64,11 +177,33 @@ def checkPath(filename, reporter=None):
         reporter = modReporter._makeDefaultReporter()
     try:
         with open(filename, 'rb') as f:
+            if maxSize is not None and os.fstat(f.fileno()).st_size > maxSize:
+                reporter.unexpectedError(
+                    filename, f'skipped, larger than {maxSize} bytes')
+                return 0
             codestr = f.read()
     except OSError as e:
         reporter.unexpectedError(filename, e.args[1])
         return 1
-    return check(codestr, filename, reporter)
+    if cache is None:
+        return check(codestr, filename, reporter, timeout)
+
+    key = cache.key(codestr, filename)
+    result = cache.get(key, filename)
+    if result is None:
+        recorder = modReporter._RecordingReporter()
+        try:
+            warnings = _check(codestr, filename, recorder, timeout)
+        except checker.CheckTimeout:
+            # Not cached: the next run may be faster
+            _reportTimeout(reporter, filename, timeout)
+            return 0
+        log = recorder.log
+        cache.put(key, warnings, log)
+    else:
+        warnings, log = result
+    modReporter._replay(log, reporter)
+    return warnings
 
 
 def isPythonFile(filename):
@@ -80,6 +215,11 @@ def isPythonFile(filename):
     if filename.endswith("~"):
         return False
 
+    return _matchShebang(filename)
+
+
+def _matchShebang(filename):
+    """Match the start of the file C{filename} against a Python shebang."""
     max_bytes = 128
 
     try:
@@ -93,26 +233,211 @@ def isPythonFile(filename):
     return PYTHON_SHEBANG_REGEX.match(text)
 
 
-def iterSourceCode(paths):
+def _isPythonEntry(entry, shebang):
+    """
+    Return True if the C{os.scandir} entry C{entry} is a Python file, reading
+    it for a shebang only as allowed by the C{shebang} mode.
+    """
+    name = entry.name
+    if name.endswith('.py'):
+        return True
+
+    # Avoid obvious Emacs backup files
+    if shebang == 'none' or name.endswith('~'):
+        return False
+
+    ext = os.path.splitext(name)[1].lower()
+    if ext in NON_PYTHON_EXTENSIONS:
+        return False
+
+    if shebang == 'scripts' and ext:
+        try:
+            st = entry.stat()
+        except OSError:
+            return False
+        if not st.st_size or not st.st_mode & 0o111:
+            return False
+
+    return _matchShebang(entry.path)
+
+
+def _excludeMatcher(patterns):
+    """
+    Return a function telling whether a directory entry matches any of the
+    glob C{patterns}, or C{None} if there are no patterns.
+
+    Patterns without a path separator are matched against the entry's name,
+    the others against its absolute path.
+    """
+    namePatterns = []
+    pathPatterns = []
+    for pattern in patterns:
+        pattern = os.path.normcase(pattern)
+        if os.sep in pattern or (os.altsep and os.altsep in pattern):
+            pathPatterns.append(fnmatch.translate(os.path.abspath(pattern)))
+        else:
+            namePatterns.append(fnmatch.translate(pattern))
+    if not namePatterns and not pathPatterns:
+        return None
+
+    matchName = re.compile('|'.join(namePatterns)).match if namePatterns else None
+    matchPath = re.compile('|'.join(pathPatterns)).match if pathPatterns else None
+
+    def excluded(entry):
+        if matchName is not None and matchName(os.path.normcase(entry.name)):
+            return True
+        return matchPath is not None and bool(
+            matchPath(os.path.normcase(os.path.abspath(entry.path))))
+    return excluded
+
+
+def _selectionMatcher(only):
+    """
+    Return a function telling whether a path is one of the files in C{only},
+    or a directory containing one, or C{None} if C{only} is C{None}.
+
+    The function takes the path and whether it is a directory.
+    """
+    if only is None:
+        return None
+    files = {os.path.normcase(os.path.abspath(path)) for path in only}
+    dirs = set()
+    for path in files:
+        parent = os.path.dirname(path)
+        while parent not in dirs:
+            dirs.add(parent)
+            parent, child = os.path.dirname(parent), parent
+            if parent == child:
+                break
+
+    def selected(path, isDir):
+        path = os.path.normcase(os.path.abspath(path))
+        return path in (dirs if isDir else files)
+    return selected
+
+
+def _iterDirectory(top, excluded, shebang, selected=None):
+    """
+    Iterate over all Python source files below the directory C{top}.
+
+    Files are found in the same order as with C{os.walk}, but excluded
+    directories are never descended into, and the file type information
+    returned by C{os.scandir} is reused rather than asked for again.
+    """
+    stack = [top]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        subdirs = []
+        with it:
+            for entry in it:
+                if excluded is not None and excluded(entry):
+                    continue
+                try:
+                    isDir = entry.is_dir()
+                except OSError:
+                    isDir = False
+                if selected is not None and not selected(entry.path, isDir):
+                    continue
+                if isDir:
+                    # Like os.walk, do not follow symbolic links to directories
+                    if not entry.is_symlink():
+                        subdirs.append(entry.path)
+                elif _isPythonEntry(entry, shebang):
+                    yield entry.path
+        stack.extend(reversed(subdirs))
+
+
+def iterSourceCode(paths, exclude=(), shebang='all', only=None):
     """
     Iterate over all Python source files in C{paths}.
 
     @param paths: A list of paths.  Directories will be recursed into and
         any .py files found will be yielded.  Any non-directories will be
         yielded as-is.
+    @param exclude: Glob patterns of files and directories to skip while
+        recursing.  Patterns containing a path separator are matched against
+        absolute paths, the others against names.  Paths given explicitly in
+        C{paths} are never skipped.
+    @param shebang: One of L{SHEBANG_MODES}, telling which files without a
+        .py extension are read to see whether they start with a Python
+        shebang line: C{'all'} of them, C{'scripts'} only (files without an
+        extension or with an executable bit set), or C{'none'}.  Files with
+        an extension from L{NON_PYTHON_EXTENSIONS} and empty files are never
+        Python files.
+    @param only: C{None}, or the paths of the only files to yield, such as
+        the files changed according to L{gitChanges}.  Directories which
+        contain none of them are not descended into.
     """
+    if shebang not in SHEBANG_MODES:
+        raise ValueError(f'unknown shebang mode: {shebang!r}')
+    excluded = _excludeMatcher(exclude)
+    selected = _selectionMatcher(only)
     for path in paths:
         if os.path.isdir(path):
-            for dirpath, dirnames, filenames in os.walk(path):
-                for filename in filenames:
-                    full_path = os.path.join(dirpath, filename)
-                    if isPythonFile(full_path):
-                        yield full_path
-        else:
+            if selected is None or selected(path, True):
+                yield from _iterDirectory(path, excluded, shebang, selected)
+        elif selected is None or selected(path, False):
             yield path
 
 
-def checkRecursive(paths, reporter):
+def _checkPathRecorded(filename, cache=None, maxSize=None, timeout=None):
+    """
+    Check the given path, recording the warnings instead of reporting them.
+
+    This is what worker processes run for L{checkRecursive}.
+
+    @return: C{(warnings, log, cacheCounts)}, where C{log} can be passed to
+        L{pyflakes.reporter._replay} and C{cacheCounts} are the cache hits
+        and misses to add to the parent process' cache.
+    """
+    recorder = modReporter._RecordingReporter()
+    if cache is None:
+        warnings = checkPath(filename, recorder, None, maxSize, timeout)
+        return warnings, recorder.log, (0, 0)
+    hits, misses = cache.hits, cache.misses
+    warnings = checkPath(filename, recorder, cache, maxSize, timeout)
+    return warnings, recorder.log, (cache.hits - hits, cache.misses - misses)
+
+
+# The most worker processes Windows can wait on
+_MAX_WINDOWS_JOBS = 61
+
+
+def _parallelMap(func, iterable, jobs):
+    """
+    Like C{map(func, iterable)}, but spread the calls over C{jobs} worker
+    processes.
+
+    Results are yielded in the order of C{iterable}, which is consumed lazily:
+    only a few calls per worker are in flight at any time.  If worker
+    processes cannot be started, the calls are made in this process.
+    """
+    if sys.platform == 'win32':
+        # ProcessPoolExecutor refuses more workers there
+        jobs = min(jobs, _MAX_WINDOWS_JOBS)
+    try:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(jobs)
+    except (ImportError, NotImplementedError, OSError):
+        # e.g. platforms without a working multiprocessing implementation
+        yield from map(func, iterable)
+        return
+
+    with executor:
+        pending = collections.deque()
+        for item in iterable:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= jobs * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def checkRecursive(paths, reporter, jobs=1, cache=None, exclude=(),
+                   shebang='all', only=None, maxSize=None, timeout=None):
     """
     Recursively check all source files in C{paths}.
 
@@ -120,14 +445,233 @@ def checkRecursive(paths, reporter):
         containing Python source files.
     @param reporter: A L{Reporter} where all of the warnings and errors
         will be reported to.
+    @param jobs: The number of processes to check files with.  C{None} or
+        less than 1 means one per CPU.  Warnings are reported in the same
+        order whatever the number of processes.
+    @param cache: A L{pyflakes.cache.ResultCache} to look the results up in
+        before checking each file, and to store them in after, or C{None}.
+    @param exclude: Glob patterns of files and directories to skip, see
+        L{iterSourceCode}.
+    @param shebang: Which files to look for a Python shebang line in, see
+        L{iterSourceCode}.
+    @param only: The only files to check, see L{iterSourceCode}.
+    @param maxSize: The size in bytes above which files are skipped, see
+        L{checkPath}.
+    @param timeout: The number of seconds after which to give up checking
+        a file, see L{checkPath}.
     @return: The number of warnings found.
     """
+    return _checkFiles(iterSourceCode(paths, exclude, shebang, only),
+                       reporter, jobs, cache, maxSize, timeout)
+
+
+def _checkFiles(filenames, reporter, jobs=1, cache=None, maxSize=None,
+                timeout=None):
+    """
+    Check the files in C{filenames}, see L{checkRecursive}.
+
+    @return: The number of warnings found.
+    """
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+
     warnings = 0
-    for sourcePath in iterSourceCode(paths):
-        warnings += checkPath(sourcePath, reporter)
+    if jobs == 1:
+        for sourcePath in filenames:
+            warnings += checkPath(sourcePath, reporter, cache, maxSize,
+                                  timeout)
+    else:
+        results = _parallelMap(
+            functools.partial(_checkPathRecorded, cache=cache,
+                              maxSize=maxSize, timeout=timeout),
+            filenames,
+            jobs,
+        )
+        for count, log, (hits, misses) in results:
+            modReporter._replay(log, reporter)
+            warnings += count
+            if cache is not None:
+                cache.hits += hits
+                cache.misses += misses
     return warnings
 
 
+def _snapshot(paths, exclude, shebang):
+    """
+    Return a mapping of the Python source files in C{paths} to their
+    modification time and size.
+    """
+    snapshot = {}
+    for sourcePath in iterSourceCode(paths, exclude, shebang):
+        try:
+            st = os.stat(sourcePath)
+        except OSError:
+            # Let checkPath report files which cannot be read
+            snapshot[sourcePath] = None
+        else:
+            snapshot[sourcePath] = (st.st_mtime_ns, st.st_size)
+    return snapshot
+
+
+def iterChangedSourceCode(paths, exclude=(), shebang='all', interval=1.0):
+    """
+    Iterate over batches of Python source files in C{paths} which changed.
+
+    The first batch holds all the files.  After that, C{paths} are polled
+    every C{interval} seconds, and a batch is yielded whenever files were
+    added or their modification time or size changed.  This never ends.
+
+    @param exclude: See L{iterSourceCode}.
+    @param shebang: See L{iterSourceCode}.
+    @return: An iterator of lists of paths, in the order of
+        L{iterSourceCode}.
+    """
+    previous = _snapshot(paths, exclude, shebang)
+    yield list(previous)
+    while True:
+        time.sleep(interval)
+        current = _snapshot(paths, exclude, shebang)
+        # Files which cannot be stat'ed have a signature of None, and are
+        # only yielded again once that changes.
+        changed = [
+            sourcePath for sourcePath, signature in current.items()
+            if sourcePath not in previous or previous[sourcePath] != signature
+        ]
+        previous = current
+        if changed:
+            yield changed
+
+
+def watch(paths, reporter, jobs=1, cache=None, exclude=(), shebang='all',
+          interval=1.0, maxSize=None, timeout=None):
+    """
+    Check all source files in C{paths}, then keep checking the ones which
+    change, see L{iterChangedSourceCode}.  This never returns.
+
+    The other parameters are those of L{checkRecursive}.
+    """
+    for filenames in iterChangedSourceCode(paths, exclude, shebang, interval):
+        # Starting worker processes costs more than checking a file or two
+        _checkFiles(filenames, reporter, jobs if len(filenames) > 1 else 1,
+                    cache, maxSize, timeout)
+        if cache is not None:
+            cache.prune()
+        # Results should show up now, even when piped
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+
+_HUNK_REGEX = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+
+
+def _git(*args):
+    """
+    Run git in the current directory.
+
+    @return: Its standard output.
+    @raise OSError: If git cannot be run.
+    @raise subprocess.CalledProcessError: If git fails.
+    """
+    import subprocess
+
+    return subprocess.run(('git',) + args, stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, check=True).stdout
+
+
+def gitChanges(base, lines=False):
+    """
+    Find the files changed in the git work tree of the current directory
+    since it forked from the revision C{base}.
+
+    Changes are those between the merge base of C{base} and C{HEAD}, and
+    the files in the work tree, so they include uncommitted changes.  New
+    files which are not ignored count as changed even before they are
+    added.  Deleted files are left out.
+
+    @param lines: Whether to find the changed lines too.
+    @return: A dict mapping the path of each changed file to C{None}, or to
+        the set of numbers of its added or changed lines if C{lines} is
+        true.  All the lines of new files count as changed.
+    @raise OSError: If git cannot be run.
+    @raise subprocess.CalledProcessError: If git fails.
+    """
+    mergeBase = _git('merge-base', base, 'HEAD').decode('ascii').strip()
+    # Paths in diffs are relative to the top of the work tree
+    top = _git('rev-parse', '--show-cdup').decode(sys.getfilesystemencoding())
+    top = os.path.abspath(top.strip() or os.curdir)
+
+    names = _git('diff', '--name-only', '-z', '--no-renames',
+                 '--diff-filter=d', mergeBase, '--').split(b'\0')
+    untracked = _git('ls-files', '--others', '--exclude-standard', '-z',
+                     '--full-name', '--', ':/').split(b'\0')
+    names = [os.path.join(top, os.fsdecode(name)) for name in names if name]
+    untracked = [os.path.join(top, os.fsdecode(name))
+                 for name in untracked if name]
+    if not lines:
+        return dict.fromkeys(names + untracked)
+
+    # Names in the diff itself may be quoted, so the names listed above are
+    # matched to the files of the diff in order instead
+    diff = _git('diff', '-U0', '--no-color', '--no-ext-diff', '--no-renames',
+                '--diff-filter=d', mergeBase, '--')
+    changes = {}
+    files = iter(names)
+    changed = None
+    for line in diff.splitlines():
+        if line.startswith(b'diff --git '):
+            changed = changes.setdefault(next(files), set())
+        elif line.startswith(b'@@') and changed is not None:
+            match = _HUNK_REGEX.match(line.decode('ascii', 'replace'))
+            if match:
+                start = int(match.group(1))
+                count = int(match.group(2) or 1)
+                changed.update(range(start, start + count))
+    changes = {path: lines for path, lines in changes.items() if lines}
+    for path in untracked:
+        try:
+            with open(path, 'rb') as f:
+                count = f.read().count(b'\n') + 1
+        except OSError:
+            # Let checking the file report the error
+            count = 1
+        changes[path] = set(range(1, count + 1))
+    return changes
+
+
+class _LineFilteringReporter:
+    """
+    A reporter passing on only the warnings about given lines to another
+    reporter.
+
+    @ivar suppressed: The number of warnings not passed on.
+    """
+
+    def __init__(self, reporter, changes):
+        """
+        @param changes: A dict mapping paths to sets of line numbers, as
+            returned by L{gitChanges}.
+        """
+        self._reporter = reporter
+        self._lines = {
+            os.path.normcase(os.path.abspath(path)): lines
+            for path, lines in changes.items()
+        }
+        self.suppressed = 0
+
+    def unexpectedError(self, *args):
+        self._reporter.unexpectedError(*args)
+
+    def syntaxError(self, *args):
+        self._reporter.syntaxError(*args)
+
+    def flake(self, message):
+        path = os.path.normcase(os.path.abspath(message.filename))
+        if message.lineno in self._lines.get(path, ()):
+            self._reporter.flake(message)
+        else:
+            self.suppressed += 1
+
+
 def _exitOnSignal(sigName, message):
     """Handles a signal with sys.exit.
 
@@ -163,23 +707,154 @@ def _get_version():
             (__version__, platform.python_version(), platform.system()))
 
 
+def _splitPatterns(value):
+    """Split a comma-separated command-line option value."""
+    return [pattern.strip() for pattern in value.split(',') if pattern.strip()]
+
+
 def main(prog=None, args=None):
     """Entry point for the script "pyflakes"."""
-    import argparse
-
     # Handle "Keyboard Interrupt" and "Broken pipe" gracefully
     _exitOnSignal('SIGINT', '... stopped')
     _exitOnSignal('SIGPIPE', 1)
 
+    raise SystemExit(_main(prog, args))
+
+
+def _makeParser(prog=None):
+    """
+    Return the argument parser of the command-line tool.
+    """
+    import argparse
+
     parser = argparse.ArgumentParser(prog=prog,
                                      description='Check Python source files for errors')
     parser.add_argument('-V', '--version', action='version', version=_get_version())
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                        help='Check files using N processes, or one per CPU '
+                             'if N is 0. Defaults to 1.')
+    parser.add_argument('--exclude', metavar='PATTERNS',
+                        default=','.join(DEFAULT_EXCLUDE),
+                        help='Comma-separated glob patterns of files and '
+                             'directories to skip while looking for Python '
+                             'files. Defaults to %(default)s.')
+    parser.add_argument('--shebang', choices=SHEBANG_MODES, default='all',
+                        help='Which files without a .py extension to read, '
+                             'looking for a Python shebang line: all of them, '
+                             'only scripts (no extension, or executable), or '
+                             'none. Defaults to %(default)s.')
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help='Cache the results of checking files in DIR, and '
+                             'reuse them for files which have not changed.')
+    parser.add_argument('--cache-max-size', type=int, metavar='MB',
+                        default=DEFAULT_CACHE_MAX_SIZE // (1024 * 1024),
+                        help='Remove the least recently used cache entries '
+                             'beyond MB megabytes. Defaults to %(default)s.')
+    parser.add_argument('--max-file-size', type=int, metavar='KB',
+                        help='Skip files larger than KB kilobytes, with a '
+                             'notice on standard error.')
+    parser.add_argument('--per-file-timeout', type=float, metavar='SECONDS',
+                        help='Give up checking a file after SECONDS seconds, '
+                             'with a notice on standard error.')
+    parser.add_argument('--diff-base', metavar='REV',
+                        help='Only check the files changed since the '
+                             'current branch forked from the git revision '
+                             'REV, including uncommitted changes. Checks the '
+                             'current directory if no paths are given.')
+    parser.add_argument('--diff-lines-only', action='store_true',
+                        help='With --diff-base, only report warnings about '
+                             'changed lines.')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running after checking the files, and '
+                             'check them again whenever they change.')
+    parser.add_argument('--watch-interval', type=float, default=1.0,
+                        metavar='SECONDS',
+                        help='How often to look for changed files in watch '
+                             'mode. Defaults to %(default)s.')
+    parser.add_argument('--lsp', action='store_true',
+                        help='Run a Language Server Protocol server on '
+                             'standard input and output instead of checking '
+                             'anything.')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Serve "python -m pyflakes.daemon" clients '
+                             'instead of checking anything, so that they do '
+                             'not pay for starting up.')
+    parser.add_argument('--socket', metavar='PATH',
+                        help='The Unix socket the daemon listens on. Defaults '
+                             'to $PYFLAKES_DAEMON_SOCKET, or a socket in '
+                             '$XDG_RUNTIME_DIR, or in a private per-user '
+                             'directory of the temporary directory.')
     parser.add_argument('path', nargs='*',
                         help='Path(s) of Python file(s) to check. STDIN if not given.')
-    args = parser.parse_args(args=args).path
+    return parser
+
+
+def _main(prog=None, args=None):
+    """
+    Run the command-line tool with the standard streams of C{sys}.
+
+    @return: Whether any warnings were found, which makes the exit status.
+    """
+    parser = _makeParser(prog)
+    options = parser.parse_args(args=args)
+    if options.lsp:
+        from pyflakes import lsp
+        return lsp.serve(sys.stdin.buffer, sys.stdout.buffer)
+    if options.daemon:
+        from pyflakes import daemon
+        daemon.serve(options.socket)
+        return False
+
     reporter = modReporter._makeDefaultReporter()
-    if args:
-        warnings = checkRecursive(args, reporter)
+    if options.cache_dir:
+        from pyflakes.cache import ResultCache
+        cache = ResultCache(options.cache_dir,
+                            options.cache_max_size * 1024 * 1024)
+    else:
+        cache = None
+    if options.max_file_size is None:
+        maxSize = None
+    else:
+        maxSize = options.max_file_size * 1024
+    only = None
+    if options.diff_lines_only and not options.diff_base:
+        parser.error('--diff-lines-only needs --diff-base')
+    if options.diff_base:
+        import subprocess
+
+        if options.watch:
+            parser.error('--watch cannot be used with --diff-base')
+
+        try:
+            only = gitChanges(options.diff_base, options.diff_lines_only)
+        except OSError as e:
+            parser.error(f'cannot run git: {e}')
+        except subprocess.CalledProcessError as e:
+            parser.error(f'git failed: {os.fsdecode(e.stderr).strip()}')
+        if options.diff_lines_only:
+            reporter = _LineFilteringReporter(reporter, only)
+        if not options.path:
+            options.path = [os.curdir]
+
+    if options.watch:
+        if not options.path:
+            parser.error('--watch needs paths to check')
+        watch(options.path, reporter, jobs=options.jobs, cache=cache,
+              exclude=_splitPatterns(options.exclude),
+              shebang=options.shebang, interval=options.watch_interval,
+              maxSize=maxSize, timeout=options.per_file_timeout)
+    elif options.path:
+        warnings = checkRecursive(options.path, reporter,
+                                  jobs=options.jobs, cache=cache,
+                                  exclude=_splitPatterns(options.exclude),
+                                  shebang=options.shebang, only=only,
+                                  maxSize=maxSize,
+                                  timeout=options.per_file_timeout)
+        if options.diff_lines_only:
+            warnings -= reporter.suppressed
+        if cache is not None:
+            cache.prune()
     else:
-        warnings = check(sys.stdin.read(), '<stdin>', reporter)
-    raise SystemExit(warnings > 0)
+        warnings = check(sys.stdin.read(), '<stdin>', reporter,
+                         options.per_file_timeout)
+    return warnings > 0
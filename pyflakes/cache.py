@@ -0,0 +1,155 @@
+"""
+Provide the ResultCache class.
+"""
+import contextlib
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+
+from pyflakes import checker, __version__
+
+DEFAULT_MAX_SIZE = 100 * 1024 * 1024
+
+
+class ResultCache:
+    """
+    An on-disk cache of the results of checking source code.
+
+    Entries are keyed by a hash of the source code together with everything
+    else that can change the results: the pyflakes and Python versions, the
+    set of builtins, whether doctests are checked and whether the source is
+    the C{__init__.py} of a package.  An entry holds what was
+    reported for the source, so a cache hit can be replayed to a reporter
+    without parsing or checking anything.
+
+    Entries are pickled, so only use a directory that nobody untrusted can
+    write to.
+
+    @ivar hits: The number of lookups which found an entry.
+    @ivar misses: The number of lookups which did not.
+    @ivar evictions: The number of entries removed by L{prune}.
+    """
+
+    def __init__(self, directory, maxSize=DEFAULT_MAX_SIZE):
+        """
+        Construct a L{ResultCache}.
+
+        @param directory: The directory to keep entries in.  It is created if
+            it does not exist.
+        @param maxSize: The total size in bytes that L{prune} reduces the
+            entries to, removing the least recently used ones first.
+        """
+        self.directory = directory
+        self.maxSize = maxSize
+        self.hits = self.misses = self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._fingerprint = '\0'.join([
+            __version__,
+            sys.implementation.name,
+            sys.version,
+            str('PYFLAKES_DOCTEST' in os.environ),
+            ','.join(sorted(checker.Checker.builtIns)),
+        ]).encode('utf-8') + b'\0'
+
+    def key(self, codestr, filename):
+        """
+        Return the key of the entry for the source code C{codestr}.
+
+        @type codestr: C{bytes}
+        @param filename: The name of the file C{codestr} was read from.  Only
+            whether it is a package's C{__init__.py} matters, as the checker
+            treats those differently.
+        """
+        package = os.path.basename(filename) == '__init__.py'
+        return hashlib.sha256(
+            self._fingerprint + str(package).encode('ascii') + b'\0' + codestr
+        ).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key, filename):
+        """
+        Look up an entry.
+
+        @param filename: The name the results should be reported against.
+        @return: C{(warnings, log)} as stored by L{put}, with C{filename}
+            filled back in, or C{None} if there is no usable entry.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                warnings, log = pickle.load(f)
+        except Exception:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Keep track of the least recently used entries for prune, where
+        # the cache can be written.
+        with contextlib.suppress(OSError):
+            os.utime(path)
+
+        replay = []
+        for method, *args in log:
+            if method == 'flake':
+                args[0].filename = filename
+            else:
+                args.insert(0, filename)
+            replay.append((method, *args))
+        return warnings, replay
+
+    def put(self, key, warnings, log):
+        """
+        Store an entry.
+
+        @param warnings: The number of warnings the source produced.
+        @param log: What was reported for the source, as recorded by a
+            L{pyflakes.reporter._RecordingReporter}.
+        """
+        # Filenames are left out: the same source gives the same results
+        # wherever it lives.
+        log = [
+            entry if entry[0] == 'flake' else (entry[0],) + entry[2:]
+            for entry in log
+        ]
+        # A cache which cannot be written to is merely slow.
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((warnings, log), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except Exception:
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+
+    def prune(self):
+        """
+        Remove the least recently used entries until the cache is no larger
+        than its maximum size.
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.maxSize:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
@@ -7,14 +7,15 @@ Also, it models the Bindings and Scopes.
 import __future__
 import builtins
 import ast
+import bisect
 import collections
 import contextlib
-import doctest
 import functools
 import os
 import re
 import string
 import sys
+import time
 import warnings
 
 from pyflakes import messages
@@ -35,6 +36,31 @@ def getAlternatives(n):
         return [mc.body for mc in n.cases]
 
 
+def _forkArms(n):
+    """
+    Map the children of C{n}, a node with alternatives, to the index of the
+    alternative they are in, as listed by L{getAlternatives}.
+
+    Children in no alternative are left out.  The children in a match are
+    its cases, including their patterns and guards.
+    """
+    if isinstance(n, ast.If):
+        return dict.fromkeys(n.body, 0)
+    elif isinstance(n, ast.Try):
+        arms = dict.fromkeys(n.body + n.orelse, 0)
+        for i, handler in enumerate(n.handlers, 1):
+            arms[handler] = i
+        return arms
+    else:
+        return {case: i for i, case in enumerate(n.cases)}
+
+
+if sys.version_info >= (3, 10):
+    _FORK_TYPES = (ast.If, ast.Try, ast.Match)
+else:
+    _FORK_TYPES = (ast.If, ast.Try)
+_FORKING_TYPES = frozenset(_FORK_TYPES)
+
 FOR_TYPES = (ast.For, ast.AsyncFor)
 
 
@@ -67,83 +93,57 @@ def _is_name_or_attr(node, name):  # type: (ast.AST, str) -> bool
     )
 
 
-MAPPING_KEY_RE = re.compile(r'\(([^()]*)\)')
-CONVERSION_FLAG_RE = re.compile('[#0+ -]*')
-WIDTH_RE = re.compile(r'(?:\*|\d*)')
-PRECISION_RE = re.compile(r'(?:\.(?:\*|\d*))?')
-LENGTH_RE = re.compile('[hlL]?')
+# A placeholder of old style string formatting, from its '%' to its conversion
+# character, which is missing at the end of the string.
+PERCENT_FORMAT_RE = re.compile(
+    r'%'
+    r'(?:\(([^()]*)\))?'     # mapping key
+    r'([#0+ -]*)'           # conversion flags
+    r'(\*|\d*)'             # minimum field width
+    r'(\.(?:\*|\d*))?'      # precision
+    r'[hlL]?'               # length modifier, ignored
+    r'(.)?',                # conversion type
+    re.DOTALL,
+)
 # https://docs.python.org/3/library/stdtypes.html#old-string-formatting
 VALID_CONVERSIONS = frozenset('diouxXeEfFgGcrsa%')
 
 
-def _must_match(regex, string, pos):
-    match = regex.match(string, pos)
-    assert match is not None
-    return match
-
-
 def parse_percent_format(s):
     """Parses the string component of a `'...' % ...` format call
 
-    Copied from https://github.com/asottile/pyupgrade at v1.20.1
+    Based on https://github.com/asottile/pyupgrade at v1.20.1, with the
+    parts of each placeholder matched by a single regex.
     """
-
-    def _parse_inner():
-        string_start = 0
-        string_end = 0
-        in_fmt = False
-
-        i = 0
-        while i < len(s):
-            if not in_fmt:
-                try:
-                    i = s.index('%', i)
-                except ValueError:  # no more % fields!
-                    yield s[string_start:], None
-                    return
-                else:
-                    string_end = i
-                    i += 1
-                    in_fmt = True
-            else:
-                key_match = MAPPING_KEY_RE.match(s, i)
-                if key_match:
-                    key = key_match.group(1)
-                    i = key_match.end()
-                else:
-                    key = None
-
-                conversion_flag_match = _must_match(CONVERSION_FLAG_RE, s, i)
-                conversion_flag = conversion_flag_match.group() or None
-                i = conversion_flag_match.end()
-
-                width_match = _must_match(WIDTH_RE, s, i)
-                width = width_match.group() or None
-                i = width_match.end()
-
-                precision_match = _must_match(PRECISION_RE, s, i)
-                precision = precision_match.group() or None
-                i = precision_match.end()
-
-                # length modifier is ignored
-                i = _must_match(LENGTH_RE, s, i).end()
-
-                try:
-                    conversion = s[i]
-                except IndexError:
-                    raise ValueError('end-of-string while parsing format')
-                i += 1
-
-                fmt = (key, conversion_flag, width, precision, conversion)
-                yield s[string_start:string_end], fmt
-
-                in_fmt = False
-                string_start = i
-
-        if in_fmt:
+    result = []
+    string_start = 0
+    for match in PERCENT_FORMAT_RE.finditer(s):
+        key, conversion_flag, width, precision, conversion = match.groups()
+        if conversion is None:
             raise ValueError('end-of-string while parsing format')
+        fmt = (key, conversion_flag or None, width or None, precision,
+               conversion)
+        result.append((s[string_start:match.start()], fmt))
+        string_start = match.end()
+    if string_start < len(s):
+        result.append((s[string_start:], None))
+    return tuple(result)
+
+
+# Format strings tend to be repeated, in logging calls for instance
+@functools.lru_cache(maxsize=4096)
+def _parse_format_cached(parse, s):
+    """
+    Parse the format string `s` with `parse`, remembering the outcome for
+    the format strings seen most recently.
 
-    return tuple(_parse_inner())
+    :return: The placeholders and None, or None and the `ValueError` raised
+        by `parse`.
+    """
+    try:
+        return tuple(parse(s)), None
+    except ValueError as e:
+        return None, e.with_traceback(None)
 
 
 class _FieldsOrder(dict):
@@ -215,6 +215,9 @@ class Binding:
                 the node that this binding was last used.
     """
 
+    # Without an instance dict: large modules make a lot of bindings
+    __slots__ = ('name', 'source', 'used')
+
     def __init__(self, name, source):
         self.name = name
         self.source = source
@@ -239,6 +242,8 @@ class Definition(Binding):
     """
     A binding that defines a function or a class.
     """
+    __slots__ = ()
+
     def redefines(self, other):
         return (
             super().redefines(other) or
@@ -248,6 +253,7 @@ class Definition(Binding):
 
 class Builtin(Definition):
     """A definition created for all Python builtins."""
+    __slots__ = ()
 
     def __init__(self, name):
         super().__init__(name, None)
@@ -293,6 +299,7 @@ class Importation(Definition):
         possibly including multiple dotted components.
     @type fullName: C{str}
     """
+    __slots__ = ('fullName', 'redefined')
 
     def __init__(self, name, source, full_name=None):
         self.fullName = full_name or name
@@ -341,6 +348,7 @@ class SubmoduleImportation(Importation):
     RedefinedWhileUnused is suppressed in `redefines` unless the submodule
     name is also the same, to avoid false positives.
     """
+    __slots__ = ()
 
     def __init__(self, name, source):
         # A dot should only appear in the name when it is a submodule import
@@ -363,6 +371,7 @@ class SubmoduleImportation(Importation):
 
 
 class ImportationFrom(Importation):
+    __slots__ = ('module', 'real_name')
 
     def __init__(self, name, source, module, real_name=None):
         self.module = module
@@ -392,6 +401,7 @@ class ImportationFrom(Importation):
 
 class StarImportation(Importation):
     """A binding created by a 'from x import *' statement."""
+    __slots__ = ()
 
     def __init__(self, name, source):
         super().__init__('*', source)
@@ -418,6 +428,7 @@ class FutureImportation(ImportationFrom):
 
     `__future__` imports are implicitly used.
     """
+    __slots__ = ()
 
     def __init__(self, name, source, scope):
         super().__init__(name, source, '__future__')
@@ -428,6 +439,7 @@ class Argument(Binding):
     """
     Represents binding a name as an argument.
     """
+    __slots__ = ()
 
 
 class Assignment(Binding):
@@ -438,12 +450,14 @@ class Assignment(Binding):
     the checker does not consider assignments in tuple/list unpacking to be
     Assignments, rather it treats them as simple Bindings.
     """
+    __slots__ = ()
 
 
 class NamedExprAssignment(Assignment):
     """
     Represents binding a name with an assignment expression.
     """
+    __slots__ = ()
 
 
 class Annotation(Binding):
@@ -454,6 +468,7 @@ class Annotation(Binding):
     undefined for most purposes. One notable exception is using the name as a type
     annotation.
     """
+    __slots__ = ()
 
     def redefines(self, other):
         """An Annotation doesn't define any name, so it cannot redefine one."""
@@ -461,11 +476,11 @@ class Annotation(Binding):
 
 
 class FunctionDefinition(Definition):
-    pass
+    __slots__ = ()
 
 
 class ClassDefinition(Definition):
-    pass
+    __slots__ = ()
 
 
 class ExportBinding(Binding):
@@ -482,6 +497,7 @@ class ExportBinding(Binding):
     Names which are imported and not otherwise used but appear in the value of
     C{__all__} will not have an unused import warning reported for them.
     """
+    __slots__ = ('names',)
 
     def __init__(self, name, source, scope):
         if '__all__' in scope and isinstance(source, ast.AugAssign):
@@ -519,6 +535,27 @@ class ExportBinding(Binding):
 
 class Scope(dict):
     importStarred = False       # set to True when import * is found
+    # The name index of the checker, and the position of the scope in every
+    # scope stack holding it, see Checker._scopesByName
+    _scopesByName = None
+    _depth = 0
+
+    def __setitem__(self, name, binding):
+        if self._scopesByName is not None and name not in self:
+            self._addName(name)
+        dict.__setitem__(self, name, binding)
+
+    def setdefault(self, name, binding):
+        if self._scopesByName is not None and name not in self:
+            self._addName(name)
+        return dict.setdefault(self, name, binding)
+
+    def _addName(self, name):
+        depths = self._scopesByName.get(name)
+        if depths is None:
+            self._scopesByName[name] = {self._depth: {id(self)}}
+        else:
+            depths.setdefault(self._depth, set()).add(id(self))
 
     def __repr__(self):
         scope_cls = self.__class__.__name__
@@ -579,10 +616,38 @@ class GeneratorScope(Scope):
 
 
 class ModuleScope(Scope):
-    """Scope for a module."""
+    """
+    Scope for a module.
+
+    @ivar starImportations: The L{StarImportation}s of the scope, by name.
+    """
     _futures_allowed = True
     _annotations_future_enabled = False
 
+    def __init__(self):
+        super().__init__()
+        self.starImportations = {}
+        self._fromList = None
+
+    def addStarImportation(self, binding):
+        """
+        Record the L{StarImportation} C{binding}, bound in this scope.
+        """
+        self.importStarred = True
+        self.starImportations[binding.name] = binding
+        self._fromList = None
+
+    def fromList(self):
+        """
+        Return the sorted, comma separated modules of the star importations
+        of the scope, as given in messages.
+        """
+        if self._fromList is None:
+            self._fromList = ', '.join(sorted(
+                binding.fullName
+                for binding in self.starImportations.values()))
+        return self._fromList
+
 
 class DoctestScope(ModuleScope):
     """Scope for a doctest."""
@@ -610,48 +675,41 @@ def getNodeName(node):
 TYPING_MODULES = frozenset(('typing', 'typing_extensions'))
 
 
-def _is_typing_helper(node, is_name_match_fn, scope_stack):
+def _typing_member(node, scope_stack):
     """
-    Internal helper to determine whether or not something is a member of a
-    typing module. This is used as part of working out whether we are within a
-    type annotation context.
+    Return the name of the member of a typing module which `node` represents,
+    or None if it does not represent one.
 
-    Note: you probably don't want to use this function directly. Instead see the
-    utils below which wrap it (`_is_typing` and `_is_any_typing_member`).
+    This is used as part of working out whether we are within a type annotation
+    context.  The checker goes through `Checker._typingMember`, which skips
+    names never bound to a typing import.
     """
+    if isinstance(node, ast.Name):
+        name = node.id
+    elif isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+        name = node.value.id
+    else:
+        return None
 
-    def _bare_name_is_attr(name):
-        for scope in reversed(scope_stack):
-            if name in scope:
-                return (
-                    isinstance(scope[name], ImportationFrom) and
-                    scope[name].module in TYPING_MODULES and
-                    is_name_match_fn(scope[name].real_name)
-                )
-
-        return False
-
-    def _module_scope_is_typing(name):
-        for scope in reversed(scope_stack):
-            if name in scope:
-                return (
-                    isinstance(scope[name], Importation) and
-                    scope[name].fullName in TYPING_MODULES
-                )
-
-        return False
+    for scope in reversed(scope_stack):
+        binding = scope.get(name)
+        if binding is not None:
+            break
+    else:
+        return None
 
-    return (
-        (
-            isinstance(node, ast.Name) and
-            _bare_name_is_attr(node.id)
-        ) or (
-            isinstance(node, ast.Attribute) and
-            isinstance(node.value, ast.Name) and
-            _module_scope_is_typing(node.value.id) and
-            is_name_match_fn(node.attr)
-        )
-    )
+    if isinstance(node, ast.Name):
+        if (
+                isinstance(binding, ImportationFrom) and
+                binding.module in TYPING_MODULES
+        ):
+            return binding.real_name
+    elif (
+            isinstance(binding, Importation) and
+            binding.fullName in TYPING_MODULES
+    ):
+        return node.attr
+    return None
 
 
 def _is_typing(node, typing_attr, scope_stack):
@@ -662,17 +720,7 @@ def _is_typing(node, typing_attr, scope_stack):
     This is used as part of working out whether we are within a type annotation
     context.
     """
-    return _is_typing_helper(node, lambda x: x == typing_attr, scope_stack)
-
-
-def _is_any_typing_member(node, scope_stack):
-    """
-    Determine whether `node` represents any member of a typing module.
-
-    This is used as part of working out whether we are within a type annotation
-    context.
-    """
-    return _is_typing_helper(node, lambda x: True, scope_stack)
+    return _typing_member(node, scope_stack) == typing_attr
 
 
 def is_typing_overload(value, scope_stack):
@@ -691,6 +739,48 @@ class AnnotationState:
     BARE = 2
 
 
+# The location of a string annotation, see Checker.handleStringAnnotation
+_Location = collections.namedtuple('_Location', ('lineno', 'col_offset'))
+
+# The nodes of string annotations whose trees are shared: these only load
+# names, without nested string annotations, so that the checker keeps no
+# reference to their nodes once done with them.
+_SHARED_ANNOTATION_NODES = (
+    ast.Name, ast.Attribute, ast.Subscript, ast.Tuple, ast.List, ast.BinOp,
+    ast.BitOr, ast.Load, ast.Constant,
+)
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_annotation(s):
+    """
+    Parse the string annotation `s`, remembering the outcome for the string
+    annotations seen most recently.
+
+    :return: None and False if `s` is not a single expression.  Otherwise
+        the expression and True if its tree can be shared by all the
+        annotations `s` is used in, or else a list holding the expression
+        for the first annotation to take it, and False: the others parse
+        their own, so that the cache keeps no tree which is never used.
+    """
+    try:
+        tree = ast.parse(s)
+    except SyntaxError:
+        return None, False
+    body = tree.body
+    if len(body) != 1 or not isinstance(body[0], ast.Expr):
+        return None, False
+    expression = body[0].value
+    shared = all(
+        isinstance(node, _SHARED_ANNOTATION_NODES) and
+        not (isinstance(node, ast.Constant) and isinstance(node.value, str))
+        for node in ast.walk(expression)
+    )
+    if shared:
+        return expression, True
+    return [expression], False
+
+
 def in_annotation(func):
     @functools.wraps(func)
     def in_annotation_func(self, *args, **kwargs):
@@ -707,6 +797,62 @@ def in_string_annotation(func):
     return in_annotation_func
 
 
+def descends(precheck):
+    """
+    Make a node handler which calls C{precheck} and then handles the children
+    of the node, unless C{precheck} returns true because it handled them
+    itself.
+
+    L{Checker} handles the children of such nodes iteratively, rather than
+    with a nested call.
+    """
+    @functools.wraps(precheck)
+    def handler(self, node):
+        if not precheck(self, node):
+            self.handleChildren(node)
+    handler.precheck = precheck
+    return handler
+
+
+class _NodeHandlers(dict):
+    """
+    The node handlers of a L{Checker} class, mapping AST node classes to
+    C{(handler, descends, precheck)}.
+
+    C{handler} is an unbound method.  If C{descends} is true, C{handler} only
+    calls C{precheck} (unless it is C{None}) and then handles the children of
+    the node if C{precheck} did not, which the traversal can do without
+    calling it.
+
+    The handler for a node class is looked up by name the first time the
+    node class is seen, and is then shared by every instance.
+    """
+
+    def __init__(self, checkerClass):
+        super().__init__()
+        self._checkerClass = checkerClass
+
+    def __missing__(self, node_class):
+        handler = getattr(
+            self._checkerClass, node_class.__name__.upper(),
+            self._checkerClass._unknown_handler,
+        )
+        if handler is Checker.handleChildren:
+            entry = (handler, True, None)
+        elif hasattr(handler, 'precheck'):
+            entry = (handler, True, handler.precheck)
+        else:
+            entry = (handler, False, None)
+        self[node_class] = entry
+        return entry
+
+
+class CheckTimeout(Exception):
+    """
+    Raised by L{Checker} when checking takes longer than its timeout.
+    """
+
+
 class Checker:
     """I check the cleanliness and sanity of Python code."""
 
@@ -724,7 +870,14 @@ class Checker:
 
     nodeDepth = 0
     offset = None
+    # Where the names of a shared string annotation tree are, while it is
+    # handled
+    _annotationLocation = None
     _in_annotation = AnnotationState.NONE
+    # With a timeout, the clock is looked at every so many nodes
+    _deadline = None
+    _timeoutInterval = 1000
+    _nodesUntilClock = 0
 
     builtIns = set(builtin_vars).union(_MAGIC_GLOBALS)
     _customBuiltIns = os.environ.get('PYFLAKES_BUILTINS')
@@ -733,11 +886,36 @@ class Checker:
     del _customBuiltIns
 
     def __init__(self, tree, filename='(none)', builtins=None,
-                 withDoctest='PYFLAKES_DOCTEST' in os.environ, file_tokens=()):
-        self._nodeHandlers = {}
+                 withDoctest='PYFLAKES_DOCTEST' in os.environ, file_tokens=(),
+                 timeout=None):
+        if timeout is not None:
+            # Checked cooperatively in handleNode, raising CheckTimeout
+            self._deadline = time.monotonic() + timeout
         self._deferred = collections.deque()
+        # node -> parent for each node handled so far, kept apart from the
+        # nodes so that trees are left untouched.  Depths and fork paths are
+        # found from it when needed, rather than kept for every node.
+        self._nodeIndex = {}
+        self._forkArms = {}
+        # name -> {depth: ids of the scopes at that depth which bound it}.
+        # Scopes are only ever pushed on top of their parents, so a scope
+        # has the same depth in every stack holding it, and the scopes of
+        # the current stack binding a name are found without walking the
+        # stack, even when deferred functions switch stacks.  Names are not
+        # removed when deleted: bindings found are checked.
+        self._scopesByName = {}
+        # Builtins bound in the module scope so far, see _bindBuiltin
+        self._boundBuiltIns = set()
+        # Names bound to a typing module or member in any scope so far, see
+        # _typingMember
+        self._typingNames = set()
         self.deadScopes = []
         self.messages = []
+        # name -> UndefinedName messages reported for it, and the messages
+        # withdrawn by global statements, left out of self.messages at the
+        # end rather than each time
+        self._undefinedNames = {}
+        self._withdrawnMessages = set()
         self.filename = filename
         if builtins:
             self.builtIns = self.builtIns.union(builtins)
@@ -745,19 +923,25 @@ class Checker:
         self.exceptHandlers = [()]
         self.root = tree
 
-        self.scopeStack = []
+        # A tuple, so that deferred functions can share it
+        self.scopeStack = ()
         try:
             scope_tp = Checker._ast_node_scope[type(tree)]
         except KeyError:
             raise RuntimeError('No scope implemented for the node %r' % tree)
 
         with self.in_scope(scope_tp):
-            for builtin in self.builtIns:
-                self.addBinding(None, Builtin(builtin))
             self.handleChildren(tree)
             self._run_deferred()
 
         self.checkDeadScopes()
+        # Only needed while checking: do not keep every node alive
+        self._nodeIndex = {}
+        self._forkArms = {}
+        self._scopesByName.clear()
+        if self._withdrawnMessages:
+            self.messages = [m for m in self.messages
+                             if m not in self._withdrawnMessages]
 
         if file_tokens:
             warnings.warn(
@@ -774,7 +958,7 @@ class Checker:
         `callable` is called, the scope at the time this is called will be
         restored, however it will contain any new bindings added to it.
         """
-        self._deferred.append((callable, self.scopeStack[:], self.offset))
+        self._deferred.append((callable, self.scopeStack, self.offset))
 
     def _run_deferred(self):
         orig = (self.scopeStack, self.offset)
@@ -792,11 +976,14 @@ class Checker:
 
     @property
     def futuresAllowed(self):
-        if not all(isinstance(scope, ModuleScope)
-                   for scope in self.scopeStack):
+        # The flag of the scope goes first: it is False once past the
+        # imports at the top of the module
+        scope = self.scope
+        if not isinstance(scope, ModuleScope) or not scope._futures_allowed:
             return False
 
-        return self.scope._futures_allowed
+        return all(isinstance(scope, ModuleScope)
+                   for scope in self.scopeStack)
 
     @futuresAllowed.setter
     def futuresAllowed(self, value):
@@ -823,11 +1010,18 @@ class Checker:
 
     @contextlib.contextmanager
     def in_scope(self, cls):
-        self.scopeStack.append(cls())
+        # Scope stacks are never changed in place, but replaced, which lets
+        # deferFunction keep the current one without copying it
+        saved_stack = self.scopeStack
+        scope = cls()
+        scope._scopesByName = self._scopesByName
+        scope._depth = len(saved_stack)
+        self.scopeStack = saved_stack + (scope,)
         try:
             yield
         finally:
-            self.deadScopes.append(self.scopeStack.pop())
+            self.deadScopes.append(scope)
+            self.scopeStack = saved_stack
 
     def checkDeadScopes(self):
         """
@@ -872,13 +1066,10 @@ class Checker:
 
                 # mark all import '*' as used by the undefined in __all__
                 if scope.importStarred:
-                    from_list = []
-                    for binding in scope.values():
-                        if isinstance(binding, StarImportation):
-                            binding.used = all_binding
-                            from_list.append(binding.fullName)
+                    for binding in scope.starImportations.values():
+                        binding.used = all_binding
                     # report * usage, with a list of possible sources
-                    from_list = ', '.join(sorted(from_list))
+                    from_list = scope.fromList()
                     for name in undefined:
                         self.report(messages.ImportStarUsage,
                                     scope['__all__'].source, name, from_list)
@@ -900,36 +1091,47 @@ class Checker:
                         self.report(messg, node, value.name, value.source)
 
     def report(self, messageClass, *args, **kwargs):
-        self.messages.append(messageClass(self.filename, *args, **kwargs))
+        message = messageClass(self.filename, *args, **kwargs)
+        self.messages.append(message)
+        if isinstance(message, messages.UndefinedName):
+            self._undefinedNames.setdefault(
+                message.message_args[0], []).append(message)
 
     def getParent(self, node):
         # Lookup the first parent which is not Tuple, List or Starred
+        index = self._nodeIndex
         while True:
-            node = node._pyflakes_parent
+            node = index[node]
             if not hasattr(node, 'elts') and not hasattr(node, 'ctx'):
                 return node
 
+    def _getDepth(self, node):
+        index = self._nodeIndex
+        depth = 0
+        while node in index:
+            node = index[node]
+            depth += 1
+        return depth
+
     def getCommonAncestor(self, lnode, rnode, stop):
-        if (
-                stop in (lnode, rnode) or
-                not (
-                    hasattr(lnode, '_pyflakes_parent') and
-                    hasattr(rnode, '_pyflakes_parent')
-                )
-        ):
-            return None
-        if lnode is rnode:
-            return lnode
-
-        if (lnode._pyflakes_depth > rnode._pyflakes_depth):
-            return self.getCommonAncestor(lnode._pyflakes_parent, rnode, stop)
-        if (lnode._pyflakes_depth < rnode._pyflakes_depth):
-            return self.getCommonAncestor(lnode, rnode._pyflakes_parent, stop)
-        return self.getCommonAncestor(
-            lnode._pyflakes_parent,
-            rnode._pyflakes_parent,
-            stop,
-        )
+        index = self._nodeIndex
+        ldepth = self._getDepth(lnode)
+        rdepth = self._getDepth(rnode)
+        while True:
+            if (
+                    stop in (lnode, rnode) or
+                    not (lnode in index and rnode in index)
+            ):
+                return None
+            if lnode is rnode:
+                return lnode
+
+            if ldepth >= rdepth:
+                lnode = index[lnode]
+                ldepth -= 1
+            if ldepth < rdepth:
+                rnode = index[rnode]
+                rdepth -= 1
 
     def descendantOf(self, node, ancestors, stop):
         for a in ancestors:
@@ -949,17 +1151,87 @@ class Checker:
     def getScopeNode(self, node):
         return self._getAncestor(node, tuple(Checker._ast_node_scope.keys()))
 
+    def _getForkPath(self, node):
+        """
+        Return the fork path of C{node}.
+
+        The fork path of a node is a list of C{(fork, arm)} pairs, one for
+        each of its ancestors with alternatives, and itself if it has some,
+        from the top, where C{arm} is the index of the alternative the node
+        is in, or C{None}: see L{_forkArms}.  Nodes are on different forks
+        when their paths first differ at the same fork, and at least one of
+        them is in an alternative there.
+        """
+        index = self._nodeIndex
+        path = []
+        if isinstance(node, _FORK_TYPES):
+            path.append((node, None))
+        while node in index:
+            parent = index[node]
+            if parent.__class__ in _FORKING_TYPES:
+                arms = self._forkArms.get(parent)
+                if arms is None:
+                    arms = self._forkArms[parent] = _forkArms(parent)
+                path.append((parent, arms.get(node)))
+            node = parent
+        path.reverse()
+        return path
+
     def differentForks(self, lnode, rnode):
         """True, if lnode and rnode are located on different forks of IF/TRY"""
-        ancestor = self.getCommonAncestor(lnode, rnode, self.root)
-        parts = getAlternatives(ancestor)
-        if parts:
-            for items in parts:
-                if self.descendantOf(lnode, items, ancestor) ^ \
-                   self.descendantOf(rnode, items, ancestor):
-                    return True
+        index = self._nodeIndex
+        if lnode not in index or rnode not in index:
+            return False
+        lpath = self._getForkPath(lnode)
+        rpath = self._getForkPath(rnode)
+        for (lfork, larm), (rfork, rarm) in zip(lpath, rpath):
+            if lfork is not rfork:
+                return False
+            if larm != rarm:
+                return larm is not None or rarm is not None
         return False
 
+    def _bindBuiltin(self, name):
+        """
+        Bind the builtin C{name} in the module scope, unless it was bound
+        already.
+
+        Binding every builtin up front would cost a binding for each of them
+        in every file, though a file only uses a few, so builtins are bound
+        when their name is first looked up or bound in the module scope
+        instead.  Each is bound at most once: once deleted or rebound, it
+        stays so.
+        """
+        if name in self._boundBuiltIns or name not in self.builtIns:
+            return
+        self._boundBuiltIns.add(name)
+        scope = self.scopeStack[0]
+        if name not in scope:
+            scope[name] = Builtin(name)
+
+    def _bindingDepths(self, name):
+        """
+        Return the depths of the scopes of the current stack which bound
+        C{name}, innermost first.
+
+        The name may have been deleted from these scopes since.
+        """
+        depths = self._scopesByName.get(name)
+        if not depths:
+            return ()
+        stack = self.scopeStack
+        size = len(stack)
+        if len(depths) == 1:
+            for depth, ids in depths.items():
+                if depth < size and id(stack[depth]) in ids:
+                    return (depth,)
+                return ()
+        return sorted(
+            (depth for depth, ids in depths.items()
+             if depth < size and id(stack[depth]) in ids),
+            reverse=True,
+        )
+
     def addBinding(self, node, value):
         """
         Called when a binding is altered.
@@ -967,11 +1239,20 @@ class Checker:
         - `node` is the statement responsible for the change
         - `value` is the new value, a Binding instance
         """
-        # assert value.source in (node, node._pyflakes_parent):
-        for scope in self.scopeStack[::-1]:
-            if value.name in scope:
+        self._bindBuiltin(value.name)
+        if isinstance(value, Importation) and (
+                value.fullName in TYPING_MODULES or
+                isinstance(value, ImportationFrom) and
+                value.module in TYPING_MODULES
+        ):
+            self._typingNames.add(value.name)
+        # assert value.source in (node, <the parent of node>):
+        scope = existing = None
+        for depth in self._bindingDepths(value.name):
+            scope = self.scopeStack[depth]
+            existing = scope.get(value.name)
+            if existing is not None:
                 break
-        existing = scope.get(value.name)
 
         if (existing and not isinstance(existing, Builtin) and
                 not self.differentForks(node, existing.source)):
@@ -996,13 +1277,14 @@ class Checker:
             elif isinstance(existing, Importation) and value.redefines(existing):
                 existing.redefined.append(node)
 
-        if value.name in self.scope:
+        current = self.scope.get(value.name)
+        if current is not None:
             # then assume the rebound name is used as a global or within a loop
-            value.used = self.scope[value.name].used
+            value.used = current.used
 
         # don't treat annotations as assignments if there is an existing value
         # in scope
-        if value.name not in self.scope or not isinstance(value, Annotation):
+        if current is None or not isinstance(value, Annotation):
             if isinstance(value, NamedExprAssignment):
                 # PEP 572: use scope in which outermost generator is defined
                 scope = next(
@@ -1019,6 +1301,23 @@ class Checker:
             else:
                 self.scope[value.name] = value
 
+    def _typingMember(self, node):
+        """
+        Return the name of the member of a typing module which C{node}
+        represents in the current scope, or C{None}.
+
+        Only names bound to a typing import somewhere are looked up.
+        """
+        if isinstance(node, ast.Name):
+            name = node.id
+        elif isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+            name = node.value.id
+        else:
+            return None
+        if name not in self._typingNames:
+            return None
+        return _typing_member(node, self.scopeStack)
+
     def _unknown_handler(self, node):
         # this environment variable configures whether to error on unknown
         # ast types.
@@ -1035,20 +1334,45 @@ class Checker:
         else:
             self.handleChildren(node)
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Subclasses may add or override handlers
+        cls._nodeHandlers = _NodeHandlers(cls)
+
     def getNodeHandler(self, node_class):
-        try:
-            return self._nodeHandlers[node_class]
-        except KeyError:
-            nodeType = node_class.__name__.upper()
-        self._nodeHandlers[node_class] = handler = getattr(
-            self, nodeType, self._unknown_handler,
-        )
-        return handler
+        return self._nodeHandlers[node_class][0].__get__(self)
 
     def handleNodeLoad(self, node, parent):
         name = getNodeName(node)
         if not name:
             return
+        if self._annotationLocation is not None:
+            # Only the location of the node is kept, and reported
+            node = self._annotationLocation
+
+        # Usually the name index finds the binding.  The stack is walked
+        # below for the other cases: names not bound yet (builtins, star
+        # imports, undefined names), annotations and __class__.
+        if name != '__class__':
+            scopeStack = self.scopeStack
+            for depth in self._bindingDepths(name):
+                scope = scopeStack[depth]
+                binding = scope.get(name)
+                if binding is None:
+                    continue
+                # Class scopes are only seen through type and generator
+                # scopes, as below
+                if isinstance(scope, ClassScope) and not all(
+                        isinstance(inner, (TypeScope, GeneratorScope))
+                        for inner in scopeStack[depth + 1:]):
+                    continue
+                if (
+                        isinstance(binding, Annotation) and
+                        not self._in_postponed_annotation
+                ):
+                    break
+                self._useBinding(scope, binding, node, parent)
+                return
 
         # only the following can access class scoped variables (since classes
         # aren't really a scope)
@@ -1057,9 +1381,10 @@ class Checker:
         # - type annotations (for generics, etc.)
         can_access_class_vars = None
         importStarred = None
+        rootScope = self.scopeStack[0]
 
         # try enclosing function scopes and global scope
-        for scope in self.scopeStack[-1::-1]:
+        for scope in reversed(self.scopeStack):
             if isinstance(scope, ClassScope):
                 if name == '__class__':
                     return
@@ -1069,31 +1394,16 @@ class Checker:
                     # iteration
                     continue
 
-            binding = scope.get(name, None)
-            if isinstance(binding, Annotation) and not self._in_postponed_annotation:
-                scope[name].used = (self.scope, node)
-                continue
-
-            if name == 'print' and isinstance(binding, Builtin):
-                if (isinstance(parent, ast.BinOp) and
-                        isinstance(parent.op, ast.RShift)):
-                    self.report(messages.InvalidPrintSyntax, node)
-
-            try:
-                scope[name].used = (self.scope, node)
+            binding = scope.get(name)
+            if binding is None and scope is rootScope:
+                self._bindBuiltin(name)
+                binding = scope.get(name)
+            if binding is not None:
+                if isinstance(binding, Annotation) and not self._in_postponed_annotation:
+                    binding.used = (self.scope, node)
+                    continue
 
-                # if the name of SubImportation is same as
-                # alias of other Importation and the alias
-                # is used, SubImportation also should be marked as used.
-                n = scope[name]
-                if isinstance(n, Importation) and n._has_alias():
-                    try:
-                        scope[n.fullName].used = (self.scope, node)
-                    except KeyError:
-                        pass
-            except KeyError:
-                pass
-            else:
+                self._useBinding(scope, binding, node, parent)
                 return
 
             importStarred = importStarred or scope.importStarred
@@ -1104,17 +1414,21 @@ class Checker:
                 )
 
         if importStarred:
-            from_list = []
-
-            for scope in self.scopeStack[-1::-1]:
-                for binding in scope.values():
-                    if isinstance(binding, StarImportation):
-                        # mark '*' imports as used for each scope
-                        binding.used = (self.scope, node)
-                        from_list.append(binding.fullName)
+            starred = [scope for scope in self.scopeStack
+                       if scope.importStarred]
+            for scope in starred:
+                for binding in scope.starImportations.values():
+                    # mark '*' imports as used for each scope
+                    binding.used = (self.scope, node)
 
             # report * usage, with a list of possible sources
-            from_list = ', '.join(sorted(from_list))
+            if len(starred) == 1:
+                from_list = starred[0].fromList()
+            else:
+                from_list = ', '.join(sorted(
+                    binding.fullName
+                    for scope in starred
+                    for binding in scope.starImportations.values()))
             self.report(messages.ImportStarUsage, node, name, from_list)
             return
 
@@ -1129,42 +1443,70 @@ class Checker:
         if 'NameError' not in self.exceptHandlers[-1]:
             self.report(messages.UndefinedName, node, name)
 
+    def _useBinding(self, scope, binding, node, parent):
+        """
+        Mark C{binding}, found in C{scope}, as used by C{node}.
+        """
+        if binding.name == 'print' and isinstance(binding, Builtin):
+            if (isinstance(parent, ast.BinOp) and
+                    isinstance(parent.op, ast.RShift)):
+                self.report(messages.InvalidPrintSyntax, node)
+
+        binding.used = (self.scope, node)
+
+        # if the name of SubImportation is same as
+        # alias of other Importation and the alias
+        # is used, SubImportation also should be marked as used.
+        if isinstance(binding, Importation) and binding._has_alias():
+            try:
+                scope[binding.fullName].used = (self.scope, node)
+            except KeyError:
+                pass
+
     def handleNodeStore(self, node):
         name = getNodeName(node)
         if not name:
             return
         # if the name hasn't already been defined in the current scope
         if isinstance(self.scope, FunctionScope) and name not in self.scope:
-            # for each function or module scope above us
-            for scope in self.scopeStack[:-1]:
-                if not isinstance(scope, (FunctionScope, ModuleScope)):
+            # for each function or module scope above us, from the outermost
+            top = len(self.scopeStack) - 1
+            for depth in reversed(self._bindingDepths(name)):
+                scope = self.scopeStack[depth]
+                if (
+                        depth == top or
+                        not isinstance(scope, (FunctionScope, ModuleScope))
+                ):
                     continue
                 # if the name was defined in that scope, and the name has
                 # been accessed already in the current scope, and hasn't
                 # been declared global
-                used = name in scope and scope[name].used
+                binding = scope.get(name)
+                used = binding is not None and binding.used
                 if used and used[0] is self.scope and name not in self.scope.globals:
                     # then it's probably a mistake
                     self.report(messages.UndefinedLocal,
-                                scope[name].used[1], name, scope[name].source)
+                                used[1], name, binding.source)
                     break
 
+        parent = self._nodeIndex[node]
         parent_stmt = self.getParent(node)
         if isinstance(parent_stmt, ast.AnnAssign) and parent_stmt.value is None:
             binding = Annotation(name, node)
         elif isinstance(parent_stmt, (FOR_TYPES, ast.comprehension)) or (
-                parent_stmt != node._pyflakes_parent and
+                parent_stmt != parent and
                 not self.isLiteralTupleUnpacking(parent_stmt)):
             binding = Binding(name, node)
         elif (
                 name == '__all__' and
                 isinstance(self.scope, ModuleScope) and
-                isinstance(
-                    node._pyflakes_parent,
-                    (ast.Assign, ast.AugAssign, ast.AnnAssign)
-                )
+                isinstance(parent, (ast.Assign, ast.AugAssign, ast.AnnAssign))
         ):
-            binding = ExportBinding(name, node._pyflakes_parent, self.scope)
+            binding = ExportBinding(name, parent, self.scope)
+            if self.scope is self.scopeStack[0]:
+                # Exported builtins are defined
+                for exported in binding.names:
+                    self._bindBuiltin(exported)
         elif isinstance(parent_stmt, ast.NamedExpr):
             binding = NamedExprAssignment(name, node)
         else:
@@ -1177,11 +1519,12 @@ class Checker:
             """
             Return `True` if node is part of a conditional body.
             """
-            current = getattr(node, '_pyflakes_parent', None)
-            while current:
+            index = self._nodeIndex
+            current = node
+            while current in index:
+                current = index[current]
                 if isinstance(current, (ast.If, ast.While, ast.IfExp)):
                     return True
-                current = getattr(current, '_pyflakes_parent', None)
             return False
 
         name = getNodeName(node)
@@ -1199,6 +1542,8 @@ class Checker:
         if isinstance(self.scope, FunctionScope) and name in self.scope.globals:
             self.scope.globals.remove(name)
         else:
+            if self.scope is self.scopeStack[0]:
+                self._bindBuiltin(name)
             try:
                 del self.scope[name]
             except KeyError:
@@ -1223,8 +1568,11 @@ class Checker:
         )
 
     def handleChildren(self, tree, omit=None):
-        for node in iter_child_nodes(tree, omit=omit):
-            self.handleNode(node, tree)
+        depth = self.nodeDepth + 1
+        stack = [(node, tree, depth)
+                 for node in iter_child_nodes(tree, omit=omit)]
+        stack.reverse()
+        self._walk(stack)
 
     def isLiteralTupleUnpacking(self, node):
         if isinstance(node, ast.Assign):
@@ -1257,73 +1605,162 @@ class Checker:
     def handleNode(self, node, parent):
         if node is None:
             return
-        if self.offset and getattr(node, 'lineno', None) is not None:
-            node.lineno += self.offset[0]
-            node.col_offset += self.offset[1]
-        if (
-                self.futuresAllowed and
-                self.nodeDepth == 0 and
-                not isinstance(node, ast.ImportFrom) and
-                not self.isDocstring(node)
-        ):
-            self.futuresAllowed = False
-        self.nodeDepth += 1
-        node._pyflakes_depth = self.nodeDepth
-        node._pyflakes_parent = parent
+        self._walk([(node, parent, self.nodeDepth + 1)])
+
+    def _walk(self, stack):
+        """
+        Handle the nodes on the work C{stack}, and their descendants.
+
+        The stack holds C{(node, parent, depth)} items, the next one last.
+        The children of nodes whose handler only descends into them are
+        pushed on the stack rather than handled with nested calls, so that
+        deep trees cost no Python frames.  Nodes are handled in the same
+        order as with a recursive traversal.
+        """
+        handlers = self._nodeHandlers
+        index = self._nodeIndex
+        baseDepth = self.nodeDepth
         try:
-            handler = self.getNodeHandler(node.__class__)
-            handler(node)
+            while stack:
+                node, parent, depth = stack.pop()
+                if self._deadline is not None:
+                    self._checkDeadline()
+                if self.offset and getattr(node, 'lineno', None) is not None:
+                    node.lineno += self.offset[0]
+                    node.col_offset += self.offset[1]
+                if (
+                        depth == 1 and
+                        self.futuresAllowed and
+                        not isinstance(node, ast.ImportFrom) and
+                        not self.isDocstring(node)
+                ):
+                    self.futuresAllowed = False
+                self.nodeDepth = depth
+                index[node] = parent
+
+                handler, descend, precheck = handlers[node.__class__]
+                if not descend:
+                    handler(self, node)
+                    continue
+                if precheck is not None and precheck(self, node):
+                    continue
+                top = len(stack)
+                depth += 1
+                for child in iter_child_nodes(node):
+                    stack.append((child, node, depth))
+                stack[top:] = reversed(stack[top:])
         finally:
-            self.nodeDepth -= 1
+            self.nodeDepth = baseDepth
 
-    _getDoctestExamples = doctest.DocTestParser().get_examples
+    def _checkDeadline(self):
+        if self._nodesUntilClock:
+            self._nodesUntilClock -= 1
+            return
+        self._nodesUntilClock = self._timeoutInterval
+        if time.monotonic() >= self._deadline:
+            raise CheckTimeout(self.filename)
+
+    def _getDoctestExamples(self, docstring):
+        # doctest is only imported when doctests are checked
+        import doctest
+        return doctest.DocTestParser().get_examples(docstring)
+
+    def _parseDoctestExamples(self, examples):
+        """
+        Parse the source of all C{examples} at once.
+
+        @return: A list with the module for each example, or C{None} if they
+            cannot be parsed as a whole and must be parsed one by one.
+        """
+        starts = []
+        lineno = 1
+        for example in examples:
+            starts.append(lineno)
+            lineno += example.source.count('\n')
+        try:
+            tree = ast.parse(''.join(e.source for e in examples), "<doctest>")
+        except SyntaxError:
+            return None
+        bodies = [[] for _ in examples]
+        for stmt in tree.body:
+            index = bisect.bisect_right(starts, stmt.lineno) - 1
+            # A statement spread over several examples would not parse on
+            # its own.
+            if bisect.bisect_right(starts, stmt.end_lineno) - 1 != index:
+                return None
+            bodies[index].append(stmt)
+        modules = []
+        for start, body in zip(starts, bodies):
+            if start != 1:
+                for stmt in body:
+                    ast.increment_lineno(stmt, 1 - start)
+            modules.append(ast.Module(body=body, type_ignores=[]))
+        return modules
 
     def handleDoctests(self, node):
         try:
             (docstring, node_lineno) = self.getDocstring(node.body[0])
-            examples = docstring and self._getDoctestExamples(docstring)
+            # Examples all start with a prompt.
+            if not docstring or '>>>' not in docstring:
+                return
+            examples = self._getDoctestExamples(docstring)
         except (ValueError, IndexError):
             # e.g. line 6 of the docstring for <string> has inconsistent
             # leading whitespace: ...
             return
         if not examples:
             return
+        trees = self._parseDoctestExamples(examples)
 
         # Place doctest in module scope
         saved_stack = self.scopeStack
-        self.scopeStack = [self.scopeStack[0]]
+        self.scopeStack = self.scopeStack[:1]
         node_offset = self.offset or (0, 0)
         with self.in_scope(DoctestScope):
+            self._bindBuiltin('_')
             if '_' not in self.scopeStack[0]:
                 self.addBinding(None, Builtin('_'))
-            for example in examples:
-                try:
-                    tree = ast.parse(example.source, "<doctest>")
-                except SyntaxError as e:
-                    position = (node_lineno + example.lineno + e.lineno,
-                                example.indent + 4 + (e.offset or 0))
-                    self.report(messages.DoctestSyntaxError, node, position)
+            for index, example in enumerate(examples):
+                if trees is not None:
+                    tree = trees[index]
                 else:
-                    self.offset = (node_offset[0] + node_lineno + example.lineno,
-                                   node_offset[1] + example.indent + 4)
-                    self.handleChildren(tree)
-                    self.offset = node_offset
+                    try:
+                        tree = ast.parse(example.source, "<doctest>")
+                    except SyntaxError as e:
+                        position = (node_lineno + example.lineno + e.lineno,
+                                    example.indent + 4 + (e.offset or 0))
+                        self.report(messages.DoctestSyntaxError, node, position)
+                        continue
+                self.offset = (node_offset[0] + node_lineno + example.lineno,
+                               node_offset[1] + example.indent + 4)
+                self.handleChildren(tree)
+                self.offset = node_offset
         self.scopeStack = saved_stack
 
     @in_string_annotation
     def handleStringAnnotation(self, s, node, ref_lineno, ref_col_offset, err):
-        try:
-            tree = ast.parse(s)
-        except SyntaxError:
+        parsed_annotation, shared = _parse_annotation(s)
+        if parsed_annotation is None:
             self.report(err, node, s)
             return
 
-        body = tree.body
-        if len(body) != 1 or not isinstance(body[0], ast.Expr):
-            self.report(err, node, s)
+        if shared and not self.offset:
+            # The tree is handled as it is, and the names it loads are
+            # located at the string instead (see handleNodeLoad)
+            saved_location = self._annotationLocation
+            self._annotationLocation = _Location(ref_lineno, ref_col_offset)
+            try:
+                self.handleNode(parsed_annotation, node)
+            finally:
+                self._annotationLocation = saved_location
             return
 
-        parsed_annotation = tree.body[0].value
+        # A tree of our own, whose nodes are moved to the string
+        if not shared and parsed_annotation:
+            parsed_annotation = parsed_annotation.pop()
+        else:
+            # The tree is shared, or another annotation took it
+            parsed_annotation = ast.parse(s).body[0].value
         for descendant in ast.walk(parsed_annotation):
             if (
                     'lineno' in descendant._attributes and
@@ -1371,10 +1808,12 @@ class Checker:
     BOOLOP = UNARYOP = SET = ATTRIBUTE = STARRED = NAMECONSTANT = \
         NAMEDEXPR = handleChildren
 
+    @descends
     def SUBSCRIPT(self, node):
         if _is_name_or_attr(node.value, 'Literal'):
             with self._enter_annotation(AnnotationState.NONE):
                 self.handleChildren(node)
+            return True
         elif _is_name_or_attr(node.value, 'Annotated'):
             self.handleNode(node.value, node)
 
@@ -1402,18 +1841,17 @@ class Checker:
                         self.handleNode(arg, node)
 
             self.handleNode(node.ctx, node)
-        else:
-            if _is_any_typing_member(node.value, self.scopeStack):
-                with self._enter_annotation():
-                    self.handleChildren(node)
-            else:
+            return True
+        elif self._typingMember(node.value) is not None:
+            with self._enter_annotation():
                 self.handleChildren(node)
+            return True
 
     def _handle_string_dot_format(self, node):
-        try:
-            placeholders = tuple(parse_format_string(node.func.value.value))
-        except ValueError as e:
-            self.report(messages.StringDotFormatInvalidFormat, node, e)
+        placeholders, error = _parse_format_cached(
+            parse_format_string, node.func.value.value)
+        if error is not None:
+            self.report(messages.StringDotFormatInvalidFormat, node, error)
             return
 
         auto = None
@@ -1467,10 +1905,11 @@ class Checker:
 
             # spec can also contain format specifiers
             if spec is not None:
-                try:
-                    spec_placeholders = tuple(parse_format_string(spec))
-                except ValueError as e:
-                    self.report(messages.StringDotFormatInvalidFormat, node, e)
+                spec_placeholders, error = _parse_format_cached(
+                    parse_format_string, spec)
+                if error is not None:
+                    self.report(messages.StringDotFormatInvalidFormat,
+                                node, error)
                     return
 
                 for _, spec_fmtkey, spec_spec, _ in spec_placeholders:
@@ -1524,6 +1963,7 @@ class Checker:
                 ', '.join(sorted(str(x) for x in missing_arguments)),
             )
 
+    @descends
     def CALL(self, node):
         if (
                 isinstance(node.func, ast.Attribute) and
@@ -1537,14 +1977,12 @@ class Checker:
         annotated = []
         not_annotated = []
 
-        if (
-            _is_typing(node.func, 'cast', self.scopeStack) and
-            len(node.args) >= 1
-        ):
+        typing_member = self._typingMember(node.func)
+        if typing_member == 'cast' and len(node.args) >= 1:
             with self._enter_annotation():
                 self.handleNode(node.args[0], node)
 
-        elif _is_typing(node.func, 'TypeVar', self.scopeStack):
+        elif typing_member == 'TypeVar':
 
             # TypeVar("T", "int", "str")
             omit += ["args"]
@@ -1558,7 +1996,7 @@ class Checker:
                 for k in node.keywords
             ]
 
-        elif _is_typing(node.func, "TypedDict", self.scopeStack):
+        elif typing_member == 'TypedDict':
             # TypedDict("a", {"a": int})
             if len(node.args) > 1 and isinstance(node.args[1], ast.Dict):
                 omit += ["args"]
@@ -1573,7 +2011,7 @@ class Checker:
             annotated += [k.value for k in node.keywords]
             not_annotated += [(k, ["value"]) for k in node.keywords]
 
-        elif _is_typing(node.func, "NamedTuple", self.scopeStack):
+        elif typing_member == 'NamedTuple':
             # NamedTuple("a", [("a", int)])
             if (
                 len(node.args) > 1 and
@@ -1604,13 +2042,12 @@ class Checker:
             with self._enter_annotation():
                 for annotated_node in annotated:
                     self.handleNode(annotated_node, node)
-        else:
-            self.handleChildren(node)
+            return True
 
     def _handle_percent_format(self, node):
-        try:
-            placeholders = parse_percent_format(node.left.value)
-        except ValueError:
+        placeholders, error = _parse_format_cached(
+            parse_percent_format, node.left.value)
+        if error is not None:
             self.report(
                 messages.PercentFormatInvalidFormat,
                 node,
@@ -1713,6 +2150,7 @@ class Checker:
                     ', '.join(sorted(missing_keys)),
                 )
 
+    @descends
     def BINOP(self, node):
         if (
                 isinstance(node.op, ast.Mod) and
@@ -1720,7 +2158,6 @@ class Checker:
                 isinstance(node.left.value, str)
         ):
             self._handle_percent_format(node)
-        self.handleChildren(node)
 
     def CONSTANT(self, node):
         if isinstance(node.value, str) and self._in_annotation:
@@ -1793,6 +2230,7 @@ class Checker:
 
     INTERPOLATION = handleChildren
 
+    @descends
     def DICT(self, node):
         # Complain if there are duplicate keys with different values
         # If they have the same value it's not going to cause potentially
@@ -1827,19 +2265,18 @@ class Checker:
                             key_node,
                             key,
                         )
-        self.handleChildren(node)
 
+    @descends
     def IF(self, node):
         if isinstance(node.test, ast.Tuple) and node.test.elts != []:
             self.report(messages.IfTuple, node)
-        self.handleChildren(node)
 
     IFEXP = IF
 
+    @descends
     def ASSERT(self, node):
         if isinstance(node.test, ast.Tuple) and node.test.elts != []:
             self.report(messages.AssertTuple, node)
-        self.handleChildren(node)
 
     def GLOBAL(self, node):
         """
@@ -1858,12 +2295,12 @@ class Checker:
                 # Remove UndefinedName messages already reported for this name.
                 # TODO: if the global is not used in this scope, it does not
                 # become a globally defined name.  See test_unused_global.
-                self.messages = [
-                    m for m in self.messages if not
-                    isinstance(m, messages.UndefinedName) or
-                    m.message_args[0] != node_name]
+                self._withdrawnMessages.update(
+                    self._undefinedNames.pop(node_name, ()))
 
                 # Bind name to global scope if it doesn't exist already.
+                if global_scope is self.scopeStack[0]:
+                    self._bindBuiltin(node_name)
                 global_scope.setdefault(node_name, node_value)
 
                 # Bind name to non-global scopes, but as already "used".
@@ -1889,7 +2326,7 @@ class Checker:
         if isinstance(node.ctx, ast.Load):
             self.handleNodeLoad(node, self.getParent(node))
             if (node.id == 'locals' and isinstance(self.scope, FunctionScope) and
-                    isinstance(node._pyflakes_parent, ast.Call)):
+                    isinstance(self._nodeIndex[node], ast.Call)):
                 # we are doing locals() call in current scope
                 self.scope.usesLocals = True
         elif isinstance(node.ctx, ast.Store):
@@ -1904,9 +2341,10 @@ class Checker:
         # Walk the tree up until we see a loop (OK), a function or class
         # definition (not OK), for 'continue', a finally block (not OK), or
         # the top module scope (not OK)
+        index = self._nodeIndex
         n = node
-        while hasattr(n, '_pyflakes_parent'):
-            n, n_child = n._pyflakes_parent, n
+        while n in index:
+            n, n_child = index[n], n
             if isinstance(n, (ast.While, ast.For, ast.AsyncFor)):
                 # Doesn't apply unless it's in the loop itself
                 if n_child not in n.orelse:
@@ -2035,6 +2473,7 @@ class Checker:
         self.handleNode(node.value, node)
         self.handleNode(node.target, node)
 
+    @descends
     def TUPLE(self, node):
         if isinstance(node.ctx, ast.Store):
             # Python 3 advanced tuple unpacking: a, *b, c = d.
@@ -2056,7 +2495,6 @@ class Checker:
                     star_loc = i
             if star_loc >= 1 << 8 or len(node.elts) - star_loc - 1 >= 1 << 24:
                 self.report(messages.TooManyExpressionsInStarredAssignment, node)
-        self.handleChildren(node)
 
     LIST = TUPLE
 
@@ -2093,9 +2531,9 @@ class Checker:
                                 node, module)
                     continue
 
-                self.scope.importStarred = True
                 self.report(messages.ImportStarUsed, node, module)
                 importation = StarImportation(module, node)
+                self.scope.addStarImportation(importation)
             else:
                 importation = ImportationFrom(name, node,
                                               module, alias.name)
@@ -2130,6 +2568,8 @@ class Checker:
 
         # If the name already exists in the scope, modify state of existing
         # binding.
+        if self.scope is self.scopeStack[0]:
+            self._bindBuiltin(node.name)
         if node.name in self.scope:
             self.handleNodeStore(node)
 
@@ -2173,12 +2613,13 @@ class Checker:
         # If the assignment has value, handle the *value* now.
         if node.value:
             # If the annotation is `TypeAlias`, handle the *value* as an annotation.
-            if _is_typing(node.annotation, 'TypeAlias', self.scopeStack):
+            if self._typingMember(node.annotation) == 'TypeAlias':
                 self.handleAnnotation(node.value, node)
             else:
                 self.handleNode(node.value, node)
         self.handleNode(node.target, node)
 
+    @descends
     def COMPARE(self, node):
         left = node.left
         for op, right in zip(node.ops, node.comparators):
@@ -2191,8 +2632,6 @@ class Checker:
                 self.report(messages.IsLiteral, node)
             left = right
 
-        self.handleChildren(node)
-
     MATCH = MATCH_CASE = MATCHCLASS = MATCHOR = MATCHSEQUENCE = handleChildren
     MATCHSINGLETON = MATCHVALUE = handleChildren
 
@@ -2221,3 +2660,6 @@ class Checker:
         self.handleNode(node.name, node)
         with self._type_param_scope(node):
             self.handle_annotation_always_deferred(node.value, node)
+
+
+Checker._nodeHandlers = _NodeHandlers(Checker)
@@ -0,0 +1,303 @@
+"""
+A resident pyflakes server, and a thin client for it.
+
+Starting the interpreter and importing the checker can cost more than
+checking one or two files.  C{pyflakes --daemon} pays for that once and then
+serves clients over a Unix socket.  The client, C{python -m pyflakes.daemon},
+takes the same arguments as C{pyflakes} and gives the same output and exit
+status, but only imports enough to talk to the server.  When no server is
+running, the client checks the files itself.
+
+The default socket is in a directory only the user can use, and clients
+only talk to sockets the user owns: anybody answering on the socket sees the
+sources checked, and decides what the client reports.
+
+The server runs with its own environment, so it refuses requests from
+clients whose pyflakes environment variables differ, and those clients fall
+back to checking the files themselves.
+"""
+import contextlib
+import importlib
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+
+# Environment variables which change what pyflakes reports.
+ENVIRONMENT = ('PYFLAKES_BUILTINS', 'PYFLAKES_DOCTEST')
+
+# Options which make pyflakes keep running, so they are not served.
+_LOCAL_OPTIONS = ('daemon', 'lsp', 'watch')
+
+
+def defaultAddress():
+    """
+    Return the path of the socket the daemon listens on by default.
+
+    This is in C{$XDG_RUNTIME_DIR} if set, or else in a per-user directory
+    of the temporary directory, which L{serve} makes private.
+    """
+    address = os.environ.get('PYFLAKES_DAEMON_SOCKET')
+    if address:
+        return address
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime:
+        return os.path.join(runtime, 'pyflakes.sock')
+    return os.path.join(_userDirectory(), 'daemon.sock')
+
+
+def _userDirectory():
+    try:
+        user = os.getuid()
+    except AttributeError:
+        user = os.environ.get('USERNAME', '')
+    return os.path.join(tempfile.gettempdir(), f'pyflakes-{user}')
+
+
+def _ownedByUser(path):
+    """
+    Return whether C{path} exists and belongs to the current user.
+    """
+    try:
+        return os.stat(path).st_uid == os.getuid()
+    except (AttributeError, OSError):
+        return False
+
+
+def _makePrivateDirectory(directory):
+    """
+    Create C{directory} if needed, for the current user only.
+
+    @raise SystemExit: If the directory belongs to somebody else, or others
+        can use it.
+    """
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    st = os.lstat(directory)
+    if not _ownedByUser(directory) or st.st_mode & 0o077:
+        raise SystemExit(f'pyflakes: {directory} must be a directory only '
+                         f'the current user can use')
+
+
+def _environment():
+    return {name: os.environ.get(name) for name in ENVIRONMENT}
+
+
+def _send(stream, message):
+    stream.write(json.dumps(message).encode('utf-8') + b'\n')
+    stream.flush()
+
+
+def _receive(stream):
+    line = stream.readline()
+    if not line:
+        raise ConnectionError('connection closed')
+    return json.loads(line)
+
+
+class _RemoteStdin:
+    """
+    Standard input for a request, read from the client only if needed.
+    """
+
+    def __init__(self, rfile, wfile):
+        self._rfile = rfile
+        self._wfile = wfile
+
+    def read(self, *args):
+        _send(self._wfile, {'stdin': True})
+        return io.StringIO(_receive(self._rfile)['stdin']).read(*args)
+
+
+def _runsLocally(args):
+    """
+    Return whether the command-line tool keeps running with C{args}, as it
+    does with any abbreviation of the options in L{_LOCAL_OPTIONS}.
+    """
+    from pyflakes import api
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()):
+            options = api._makeParser().parse_args(args)
+    except SystemExit:
+        # Bad arguments, --help or --version: running the tool reports them.
+        return False
+    return any(getattr(options, name) for name in _LOCAL_OPTIONS)
+
+
+def _run(request, stdin):
+    """
+    Run the command-line tool as asked by C{request}.
+
+    @return: The response for the client.
+    """
+    from pyflakes import api
+
+    if request.get('env') != _environment():
+        return {'error': 'environment mismatch'}
+    if _runsLocally(request['args']):
+        return {'error': 'these options only work locally'}
+
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    cwd = os.getcwd()
+    streams = sys.stdin, sys.stdout, sys.stderr
+    try:
+        os.chdir(request['cwd'])
+        sys.stdin, sys.stdout, sys.stderr = stdin, stdout, stderr
+        try:
+            status = api._main(request.get('prog'), request['args'])
+        except SystemExit as e:
+            status = e.code
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = streams
+        os.chdir(cwd)
+
+    # Like the interpreter does with the argument of SystemExit
+    if status is None:
+        status = 0
+    elif not isinstance(status, int):
+        stderr.write(f'{status}\n')
+        status = 1
+    return {
+        'status': int(status),
+        'stdout': stdout.getvalue(),
+        'stderr': stderr.getvalue(),
+    }
+
+
+def _makeServer(address):
+    """
+    Make the daemon's server, listening on C{address}.
+    """
+    import socketserver
+
+    if not hasattr(socketserver, 'UnixStreamServer'):
+        raise SystemExit('pyflakes: the daemon needs Unix domain sockets')
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            try:
+                request = _receive(self.rfile)
+                response = _run(request, _RemoteStdin(self.rfile, self.wfile))
+                _send(self.wfile, response)
+            except (OSError, ValueError):
+                # The client went away or sent garbage: nothing to answer
+                pass
+
+    # A socket left behind by a daemon which is no longer running
+    with socket.socket(socket.AF_UNIX) as probe:
+        try:
+            probe.connect(address)
+        except OSError:
+            if os.path.exists(address):
+                os.remove(address)
+        else:
+            raise SystemExit(f'pyflakes: a daemon is already listening on '
+                             f'{address}')
+
+    umask = os.umask(0o077)
+    try:
+        return socketserver.UnixStreamServer(address, Handler)
+    finally:
+        os.umask(umask)
+
+
+def serve(address=None):
+    """
+    Serve clients on the Unix socket C{address} until interrupted.
+    """
+    if address is None:
+        address = defaultAddress()
+        if os.path.dirname(address) == _userDirectory():
+            _makePrivateDirectory(_userDirectory())
+    # Warm up: this is what clients should not have to wait for.
+    importlib.import_module('pyflakes.api')
+
+    server = _makeServer(address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        with contextlib.suppress(OSError):
+            os.remove(address)
+
+
+def _request(address, request):
+    """
+    Send C{request} to the daemon listening on C{address}.
+
+    @return: The response, or C{None} if no daemon could handle it, or the
+        socket does not belong to the current user.
+    """
+    # Whoever answers gets the request, and decides what is reported
+    if not _ownedByUser(address):
+        return None
+    try:
+        sock = socket.socket(socket.AF_UNIX)
+    except (AttributeError, OSError):
+        return None
+    stdin = sys.stdin
+    with sock:
+        try:
+            sock.connect(address)
+        except OSError:
+            return None
+        rfile = sock.makefile('rb')
+        wfile = sock.makefile('wb')
+        try:
+            _send(wfile, request)
+            while True:
+                response = _receive(rfile)
+                if 'stdin' not in response:
+                    break
+                _send(wfile, {'stdin': stdin.read()})
+        except (OSError, ValueError):
+            return None
+        finally:
+            rfile.close()
+            wfile.close()
+    if 'error' in response:
+        return None
+    return response
+
+
+def main(args=None):
+    """
+    Entry point for "python -m pyflakes.daemon", the client of the daemon.
+
+    The arguments are those of C{pyflakes}, optionally preceded by
+    C{--socket PATH}.
+    """
+    if args is None:
+        args = sys.argv[1:]
+    address = None
+    if args[:1] == ['--socket'] and len(args) > 1:
+        address, args = args[1], args[2:]
+    if address is None:
+        address = defaultAddress()
+
+    response = _request(address, {
+        'prog': 'pyflakes',
+        'args': args,
+        'cwd': os.getcwd(),
+        'env': _environment(),
+    })
+    if response is None:
+        from pyflakes import api
+        api.main(prog='pyflakes', args=args)
+
+    sys.stdout.write(response['stdout'])
+    sys.stderr.write(response['stderr'])
+    raise SystemExit(response['status'])
+
+
+if __name__ == '__main__':
+    main()
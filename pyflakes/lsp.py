@@ -0,0 +1,326 @@
+"""
+A Language Server Protocol server publishing pyflakes warnings as
+diagnostics, started with C{pyflakes --lsp}.
+
+Only the diagnostics side of the protocol is implemented: documents are
+checked when they are opened, changed or saved, and their warnings are
+published.  Changes typed in quick succession are checked once, after
+L{DEBOUNCE_DELAY} seconds without further changes.  Documents whose text did
+not change since they were last checked are not checked again, and documents
+which are not open are never checked.
+"""
+import ast
+import json
+import queue
+import threading
+import time
+
+from pyflakes import checker
+
+# Seconds to wait after a change for more changes before checking
+DEBOUNCE_DELAY = 0.3
+
+# LSP constants
+_TEXT_DOCUMENT_SYNC_FULL = 1
+_SEVERITY_ERROR = 1
+_SEVERITY_WARNING = 2
+_METHOD_NOT_FOUND = -32601
+_INVALID_REQUEST = -32600
+_INVALID_PARAMS = -32602
+_INTERNAL_ERROR = -32603
+
+
+def _readMessage(stream):
+    """
+    Read one message from the binary C{stream}.
+
+    @return: The decoded message, or C{None} at the end of the stream.
+    """
+    length = None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            length = int(value)
+    if length is None:
+        raise ValueError('message without a Content-Length header')
+    body = stream.read(length)
+    if len(body) < length:
+        return None
+    return json.loads(body)
+
+
+def _writeMessage(stream, message):
+    """
+    Write one message to the binary C{stream}.
+    """
+    body = json.dumps(message).encode('utf-8')
+    stream.write(b'Content-Length: %d\r\n\r\n' % len(body))
+    stream.write(body)
+    stream.flush()
+
+
+def _utf16Length(text):
+    return len(text.encode('utf-16-le')) // 2
+
+
+def _position(lines, lineno, col, utf8=False):
+    """
+    Convert a 1-based line number and a 0-based column to an LSP position.
+
+    @param utf8: Whether C{col} counts UTF-8 bytes, as the columns of AST
+        nodes do, rather than characters.
+    """
+    line = max(lineno - 1, 0)
+    text = lines[line] if line < len(lines) else ''
+    if utf8:
+        prefix = text.encode('utf-8')[:col].decode('utf-8', 'replace')
+    else:
+        prefix = text[:col]
+    return {'line': line, 'character': _utf16Length(prefix)}
+
+
+def _diagnostics(text, filename):
+    """
+    Check the Python source C{text}.
+
+    @return: A list of LSP diagnostics.
+    """
+    lines = text.splitlines()
+    try:
+        tree = ast.parse(text, filename=filename)
+    except SyntaxError as e:
+        position = _position(lines, e.lineno or 1, (e.offset or 1) - 1)
+        return [{
+            'range': {'start': position, 'end': position},
+            'severity': _SEVERITY_ERROR,
+            'source': 'pyflakes',
+            'message': e.args[0],
+        }]
+    except Exception:
+        position = {'line': 0, 'character': 0}
+        return [{
+            'range': {'start': position, 'end': position},
+            'severity': _SEVERITY_ERROR,
+            'source': 'pyflakes',
+            'message': 'problem decoding source',
+        }]
+
+    w = checker.Checker(tree, filename=filename)
+    w.messages.sort(key=lambda m: (m.lineno, m.col))
+    diagnostics = []
+    for message in w.messages:
+        position = _position(lines, message.lineno, message.col, utf8=True)
+        diagnostics.append({
+            'range': {'start': position, 'end': position},
+            'severity': _SEVERITY_WARNING,
+            'source': 'pyflakes',
+            'code': type(message).__name__,
+            'message': message.message % message.message_args,
+        })
+    return diagnostics
+
+
+class LanguageServer:
+    """
+    A language server talking LSP over a pair of binary streams.
+
+    @ivar documents: The text of open documents, by URI.
+    """
+
+    def __init__(self, instream, outstream, delay=DEBOUNCE_DELAY):
+        """
+        Construct a L{LanguageServer}.
+
+        @param instream: The binary stream messages are read from.
+        @param outstream: The binary stream messages are written to.
+        @param delay: Seconds to wait for more changes to a document before
+            checking it.
+        """
+        self._instream = instream
+        self._outstream = outstream
+        self._delay = delay
+        self._shutdown = False
+        self._exited = False
+        self.documents = {}
+        # URI -> the time at which to check a changed document
+        self._pending = {}
+        # URI -> (text, diagnostics) last published
+        self._published = {}
+        self._handlers = {
+            'initialize': self._initialize,
+            'shutdown': self._shutdownRequest,
+            'exit': self._exit,
+            'textDocument/didOpen': self._didOpen,
+            'textDocument/didChange': self._didChange,
+            'textDocument/didSave': self._didSave,
+            'textDocument/didClose': self._didClose,
+        }
+
+    def _read(self, messages):
+        try:
+            while True:
+                message = _readMessage(self._instream)
+                messages.put(message)
+                if message is None:
+                    break
+        except (OSError, ValueError):
+            messages.put(None)
+
+    def run(self):
+        """
+        Serve the client until it exits or goes away.
+
+        @return: The exit status: 0 if the client asked for a shutdown before
+            exiting, 1 otherwise.
+        """
+        messages = queue.Queue()
+        reader = threading.Thread(target=self._read, args=(messages,))
+        reader.daemon = True
+        reader.start()
+
+        while not self._exited:
+            if self._pending:
+                timeout = max(min(self._pending.values()) - time.monotonic(),
+                              0)
+            else:
+                timeout = None
+            try:
+                message = messages.get(timeout=timeout)
+            except queue.Empty:
+                pass
+            else:
+                if message is None:
+                    break
+                self._dispatch(message)
+            now = time.monotonic()
+            for uri, deadline in list(self._pending.items()):
+                if deadline <= now:
+                    try:
+                        self._check(uri)
+                    except Exception:
+                        # Like a failing notification, this must not take
+                        # the server down
+                        pass
+        return 0 if self._shutdown else 1
+
+    def _dispatch(self, message):
+        method = message.get('method')
+        handler = self._handlers.get(method)
+        if 'id' not in message:
+            # A notification, which gets no response: one which cannot be
+            # handled is dropped, like unknown ones
+            if handler is not None:
+                try:
+                    handler(message.get('params') or {})
+                except Exception:
+                    pass
+            return
+        if handler is None:
+            error = {'code': _METHOD_NOT_FOUND,
+                     'message': f'unsupported method: {method}'}
+            self._send({'id': message['id'], 'error': error})
+        elif self._shutdown:
+            error = {'code': _INVALID_REQUEST,
+                     'message': 'the server is shutting down'}
+            self._send({'id': message['id'], 'error': error})
+        else:
+            try:
+                result = handler(message.get('params') or {})
+            except (KeyError, TypeError, AttributeError) as e:
+                error = {'code': _INVALID_PARAMS,
+                         'message': f'invalid parameters: {e!r}'}
+                self._send({'id': message['id'], 'error': error})
+            except Exception as e:
+                error = {'code': _INTERNAL_ERROR, 'message': repr(e)}
+                self._send({'id': message['id'], 'error': error})
+            else:
+                self._send({'id': message['id'], 'result': result})
+
+    def _send(self, message):
+        message['jsonrpc'] = '2.0'
+        _writeMessage(self._outstream, message)
+
+    def _check(self, uri):
+        """
+        Check the open document C{uri}, and publish its diagnostics if they
+        changed.
+        """
+        self._pending.pop(uri, None)
+        text = self.documents[uri]
+        published = self._published.get(uri)
+        if published is not None and published[0] == text:
+            return
+        diagnostics = _diagnostics(text, uri)
+        self._published[uri] = (text, diagnostics)
+        if published is None or published[1] != diagnostics:
+            self._publish(uri, diagnostics)
+
+    def _publish(self, uri, diagnostics):
+        self._send({
+            'method': 'textDocument/publishDiagnostics',
+            'params': {'uri': uri, 'diagnostics': diagnostics},
+        })
+
+    def _initialize(self, params):
+        return {
+            'capabilities': {
+                'textDocumentSync': {
+                    'openClose': True,
+                    'change': _TEXT_DOCUMENT_SYNC_FULL,
+                    'save': True,
+                },
+            },
+            'serverInfo': {'name': 'pyflakes'},
+        }
+
+    def _shutdownRequest(self, params):
+        self._shutdown = True
+        self._pending.clear()
+        return None
+
+    def _exit(self, params):
+        self._exited = True
+
+    def _didOpen(self, params):
+        document = params['textDocument']
+        self.documents[document['uri']] = document['text']
+        self._check(document['uri'])
+
+    def _didChange(self, params):
+        uri = params['textDocument']['uri']
+        changes = params['contentChanges']
+        if uri not in self.documents or not changes:
+            return
+        # Only full text changes are asked for
+        self.documents[uri] = changes[-1]['text']
+        self._pending[uri] = time.monotonic() + self._delay
+
+    def _didSave(self, params):
+        uri = params['textDocument']['uri']
+        if uri not in self.documents:
+            return
+        if 'text' in params:
+            self.documents[uri] = params['text']
+        self._check(uri)
+
+    def _didClose(self, params):
+        uri = params['textDocument']['uri']
+        self.documents.pop(uri, None)
+        self._pending.pop(uri, None)
+        if self._published.pop(uri, None) is not None:
+            self._publish(uri, [])
+
+
+def serve(instream, outstream):
+    """
+    Serve a client over the binary streams C{instream} and C{outstream}.
+
+    @return: The exit status, see L{LanguageServer.run}.
+    """
+    return LanguageServer(instream, outstream).run()
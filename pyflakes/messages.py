@@ -4,13 +4,15 @@ Provide the class Message and its subclasses.
 
 
 class Message:
+    # Without an instance dict: there can be a lot of messages
+    __slots__ = ('filename', 'lineno', 'col', 'message_args')
     message = ''
-    message_args = ()
 
     def __init__(self, filename, loc):
         self.filename = filename
         self.lineno = loc.lineno
         self.col = loc.col_offset
+        self.message_args = ()
 
     def __str__(self):
         return '{}:{}:{}: {}'.format(self.filename, self.lineno, self.col+1,
@@ -18,6 +20,7 @@ class Message:
 
 
 class UnusedImport(Message):
+    __slots__ = ()
     message = '%r imported but unused'
 
     def __init__(self, filename, loc, name):
@@ -26,6 +29,7 @@ class UnusedImport(Message):
 
 
 class RedefinedWhileUnused(Message):
+    __slots__ = ()
     message = 'redefinition of unused %r from line %r'
 
     def __init__(self, filename, loc, name, orig_loc):
@@ -34,6 +38,7 @@ class RedefinedWhileUnused(Message):
 
 
 class ImportShadowedByLoopVar(Message):
+    __slots__ = ()
     message = 'import %r from line %r shadowed by loop variable'
 
     def __init__(self, filename, loc, name, orig_loc):
@@ -42,6 +47,7 @@ class ImportShadowedByLoopVar(Message):
 
 
 class ImportStarNotPermitted(Message):
+    __slots__ = ()
     message = "'from %s import *' only allowed at module level"
 
     def __init__(self, filename, loc, modname):
@@ -50,6 +56,7 @@ class ImportStarNotPermitted(Message):
 
 
 class ImportStarUsed(Message):
+    __slots__ = ()
     message = "'from %s import *' used; unable to detect undefined names"
 
     def __init__(self, filename, loc, modname):
@@ -58,6 +65,7 @@ class ImportStarUsed(Message):
 
 
 class ImportStarUsage(Message):
+    __slots__ = ()
     message = "%r may be undefined, or defined from star imports: %s"
 
     def __init__(self, filename, loc, name, from_list):
@@ -66,6 +74,7 @@ class ImportStarUsage(Message):
 
 
 class UndefinedName(Message):
+    __slots__ = ()
     message = 'undefined name %r'
 
     def __init__(self, filename, loc, name):
@@ -74,6 +83,7 @@ class UndefinedName(Message):
 
 
 class DoctestSyntaxError(Message):
+    __slots__ = ()
     message = 'syntax error in doctest'
 
     def __init__(self, filename, loc, position=None):
@@ -84,6 +94,7 @@ class DoctestSyntaxError(Message):
 
 
 class UndefinedExport(Message):
+    __slots__ = ()
     message = 'undefined name %r in __all__'
 
     def __init__(self, filename, loc, name):
@@ -92,6 +103,7 @@ class UndefinedExport(Message):
 
 
 class UndefinedLocal(Message):
+    # No __slots__, as the message is chosen for each instance
     message = 'local variable %r {0} referenced before assignment'
 
     default = 'defined in enclosing scope on line %r'
@@ -108,6 +120,7 @@ class UndefinedLocal(Message):
 
 
 class DuplicateArgument(Message):
+    __slots__ = ()
     message = 'duplicate argument %r in function definition'
 
     def __init__(self, filename, loc, name):
@@ -116,6 +129,7 @@ class DuplicateArgument(Message):
 
 
 class MultiValueRepeatedKeyLiteral(Message):
+    __slots__ = ()
     message = 'dictionary key %r repeated with different values'
 
     def __init__(self, filename, loc, key):
@@ -124,6 +138,7 @@ class MultiValueRepeatedKeyLiteral(Message):
 
 
 class MultiValueRepeatedKeyVariable(Message):
+    __slots__ = ()
     message = 'dictionary key variable %s repeated with different values'
 
     def __init__(self, filename, loc, key):
@@ -132,11 +147,13 @@ class MultiValueRepeatedKeyVariable(Message):
 
 
 class LateFutureImport(Message):
+    __slots__ = ()
     message = 'from __future__ imports must occur at the beginning of the file'
 
 
 class FutureFeatureNotDefined(Message):
     """An undefined __future__ feature name was imported."""
+    __slots__ = ()
     message = 'future feature %s is not defined'
 
     def __init__(self, filename, loc, name):
@@ -149,6 +166,7 @@ class UnusedVariable(Message):
     Indicates that a variable has been explicitly assigned to but not actually
     used.
     """
+    __slots__ = ()
     message = 'local variable %r is assigned to but never used'
 
     def __init__(self, filename, loc, names):
@@ -161,6 +179,7 @@ class UnusedAnnotation(Message):
     Indicates that a variable has been explicitly annotated to but not actually
     used.
     """
+    __slots__ = ()
     message = 'local variable %r is annotated but never used'
 
     def __init__(self, filename, loc, names):
@@ -170,6 +189,7 @@ class UnusedAnnotation(Message):
 
 class UnusedIndirectAssignment(Message):
     """A `global` or `nonlocal` statement where the name is never reassigned"""
+    __slots__ = ()
     message = '`%s %s` is unused: name is never assigned in scope'
 
     def __init__(self, filename, loc, name):
@@ -181,6 +201,7 @@ class ReturnOutsideFunction(Message):
     """
     Indicates a return statement outside of a function/method.
     """
+    __slots__ = ()
     message = '\'return\' outside function'
 
 
@@ -188,6 +209,7 @@ class YieldOutsideFunction(Message):
     """
     Indicates a yield or yield from statement outside of a function/method.
     """
+    __slots__ = ()
     message = '\'yield\' outside function'
 
 
@@ -197,6 +219,7 @@ class ContinueOutsideLoop(Message):
     """
     Indicates a continue statement outside of a while or for loop.
     """
+    __slots__ = ()
     message = '\'continue\' not properly in loop'
 
 
@@ -204,6 +227,7 @@ class BreakOutsideLoop(Message):
     """
     Indicates a break statement outside of a while or for loop.
     """
+    __slots__ = ()
     message = '\'break\' outside loop'
 
 
@@ -211,6 +235,7 @@ class DefaultExceptNotLast(Message):
     """
     Indicates an except: block as not the last exception handler.
     """
+    __slots__ = ()
     message = 'default \'except:\' must be last'
 
 
@@ -218,6 +243,7 @@ class TwoStarredExpressions(Message):
     """
     Two or more starred expressions in an assignment (a, *b, *c = d).
     """
+    __slots__ = ()
     message = 'two starred expressions in assignment'
 
 
@@ -225,6 +251,7 @@ class TooManyExpressionsInStarredAssignment(Message):
     """
     Too many expressions in an assignment with star-unpacking
     """
+    __slots__ = ()
     message = 'too many expressions in star-unpacking assignment'
 
 
@@ -232,6 +259,7 @@ class IfTuple(Message):
     """
     Conditional test is a non-empty tuple literal, which are always True.
     """
+    __slots__ = ()
     message = '\'if tuple literal\' is always true, perhaps remove accidental comma?'
 
 
@@ -239,10 +267,12 @@ class AssertTuple(Message):
     """
     Assertion test is a non-empty tuple literal, which are always True.
     """
+    __slots__ = ()
     message = 'assertion is always true, perhaps remove parentheses?'
 
 
 class ForwardAnnotationSyntaxError(Message):
+    __slots__ = ()
     message = 'syntax error in forward annotation %r'
 
     def __init__(self, filename, loc, annotation):
@@ -251,26 +281,32 @@ class ForwardAnnotationSyntaxError(Message):
 
 
 class RaiseNotImplemented(Message):
+    __slots__ = ()
     message = "'raise NotImplemented' should be 'raise NotImplementedError'"
 
 
 class InvalidPrintSyntax(Message):
+    __slots__ = ()
     message = 'use of >> is invalid with print function'
 
 
 class IsLiteral(Message):
+    __slots__ = ()
     message = 'use ==/!= to compare constant literals (str, bytes, int, float, tuple)'
 
 
 class FStringMissingPlaceholders(Message):
+    __slots__ = ()
     message = 'f-string is missing placeholders'
 
 
 class TStringMissingPlaceholders(Message):
+    __slots__ = ()
     message = 't-string is missing placeholders'
 
 
 class StringDotFormatExtraPositionalArguments(Message):
+    __slots__ = ()
     message = "'...'.format(...) has unused arguments at position(s): %s"
 
     def __init__(self, filename, loc, extra_positions):
@@ -279,6 +315,7 @@ class StringDotFormatExtraPositionalArguments(Message):
 
 
 class StringDotFormatExtraNamedArguments(Message):
+    __slots__ = ()
     message = "'...'.format(...) has unused named argument(s): %s"
 
     def __init__(self, filename, loc, extra_keywords):
@@ -287,6 +324,7 @@ class StringDotFormatExtraNamedArguments(Message):
 
 
 class StringDotFormatMissingArgument(Message):
+    __slots__ = ()
     message = "'...'.format(...) is missing argument(s) for placeholder(s): %s"
 
     def __init__(self, filename, loc, missing_arguments):
@@ -295,10 +333,12 @@ class StringDotFormatMissingArgument(Message):
 
 
 class StringDotFormatMixingAutomatic(Message):
+    __slots__ = ()
     message = "'...'.format(...) mixes automatic and manual numbering"
 
 
 class StringDotFormatInvalidFormat(Message):
+    __slots__ = ()
     message = "'...'.format(...) has invalid format string: %s"
 
     def __init__(self, filename, loc, error):
@@ -307,6 +347,7 @@ class StringDotFormatInvalidFormat(Message):
 
 
 class PercentFormatInvalidFormat(Message):
+    __slots__ = ()
     message = "'...' %% ... has invalid format string: %s"
 
     def __init__(self, filename, loc, error):
@@ -315,10 +356,12 @@ class PercentFormatInvalidFormat(Message):
 
 
 class PercentFormatMixedPositionalAndNamed(Message):
+    __slots__ = ()
     message = "'...' %% ... has mixed positional and named placeholders"
 
 
 class PercentFormatUnsupportedFormatCharacter(Message):
+    __slots__ = ()
     message = "'...' %% ... has unsupported format character %r"
 
     def __init__(self, filename, loc, c):
@@ -327,6 +370,7 @@ class PercentFormatUnsupportedFormatCharacter(Message):
 
 
 class PercentFormatPositionalCountMismatch(Message):
+    __slots__ = ()
     message = "'...' %% ... has %d placeholder(s) but %d substitution(s)"
 
     def __init__(self, filename, loc, n_placeholders, n_substitutions):
@@ -335,6 +379,7 @@ class PercentFormatPositionalCountMismatch(Message):
 
 
 class PercentFormatExtraNamedArguments(Message):
+    __slots__ = ()
     message = "'...' %% ... has unused named argument(s): %s"
 
     def __init__(self, filename, loc, extra_keywords):
@@ -343,6 +388,7 @@ class PercentFormatExtraNamedArguments(Message):
 
 
 class PercentFormatMissingArgument(Message):
+    __slots__ = ()
     message = "'...' %% ... is missing argument(s) for placeholder(s): %s"
 
     def __init__(self, filename, loc, missing_arguments):
@@ -351,12 +397,15 @@ class PercentFormatMissingArgument(Message):
 
 
 class PercentFormatExpectedMapping(Message):
+    __slots__ = ()
     message = "'...' %% ... expected mapping but got sequence"
 
 
 class PercentFormatExpectedSequence(Message):
+    __slots__ = ()
     message = "'...' %% ... expected sequence but got mapping"
 
 
 class PercentFormatStarRequiresSequence(Message):
+    __slots__ = ()
     message = "'...' %% ... `*` specifier requires sequence"
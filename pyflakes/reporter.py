@@ -90,3 +90,33 @@ def _makeDefaultReporter():
     Make a reporter that can be used when no reporter is specified.
     """
     return Reporter(sys.stdout, sys.stderr)
+
+
+class _RecordingReporter:
+    """
+    A reporter which records everything reported to it, so that it can be
+    replayed to another reporter later, possibly in another process.
+
+    @ivar log: A list of C{(methodName, *args)} tuples, in reporting order.
+    """
+
+    def __init__(self):
+        self.log = []
+
+    def unexpectedError(self, filename, msg):
+        self.log.append(('unexpectedError', filename, msg))
+
+    def syntaxError(self, filename, msg, lineno, offset, text):
+        self.log.append(('syntaxError', filename, msg, lineno, offset, text))
+
+    def flake(self, message):
+        self.log.append(('flake', message))
+
+
+def _replay(log, reporter):
+    """
+    Report everything recorded in C{log} by a L{_RecordingReporter} to
+    C{reporter}.
+    """
+    for method, *args in log:
+        getattr(reporter, method)(*args)
@@ -10,14 +10,19 @@ import shutil
 import subprocess
 import tempfile
 
+from pyflakes import api, cache as modCache
+from pyflakes.cache import ResultCache
 from pyflakes.checker import PYPY
 from pyflakes.messages import UnusedImport
 from pyflakes.reporter import Reporter
 from pyflakes.api import (
     main,
     check,
+    checkMany,
     checkPath,
     checkRecursive,
+    gitChanges,
+    iterChangedSourceCode,
     iterSourceCode,
 )
 from pyflakes.test.harness import TestCase, skipIf
@@ -194,6 +199,48 @@ class TestIterSourceCode(TestCase):
                 python38m,
             ]))
 
+    def makeScript(self, name, executable=False):
+        path = os.path.join(self.tempdir, name)
+        with open(path, 'w') as fd:
+            fd.write('#!/usr/bin/env python\n')
+        if executable:
+            os.chmod(path, 0o755)
+        return path
+
+    def test_shebangNonPythonExtension(self):
+        """
+        Files with the extension of a format which cannot start with a
+        shebang line are not read.
+        """
+        self.makeScript('a.json')
+        self.makeScript('b.pyc')
+        cpath = self.makeScript('c.cfg')
+        self.assertEqual(list(iterSourceCode([self.tempdir])), [cpath])
+
+    @skipIf(sys.platform == 'win32', 'no executable bit on Windows')
+    def test_shebangScripts(self):
+        """
+        With the C{'scripts'} shebang mode, only files without an extension
+        or with an executable bit set are read.
+        """
+        apath = self.makeScript('a')
+        bpath = self.makeScript('b.cgi', executable=True)
+        self.makeScript('c.txt')
+        self.makeEmptyFile('d.sh')
+        os.chmod(os.path.join(self.tempdir, 'd.sh'), 0o755)
+        self.assertEqual(
+            sorted(iterSourceCode([self.tempdir], shebang='scripts')),
+            sorted([apath, bpath]))
+
+    def test_shebangNone(self):
+        """
+        With the C{'none'} shebang mode, only .py files are found.
+        """
+        self.makeScript('a')
+        bpath = self.makeEmptyFile('b.py')
+        self.assertEqual(list(iterSourceCode([self.tempdir], shebang='none')),
+                         [bpath])
+
     def test_multipleDirectories(self):
         """
         L{iterSourceCode} can be given multiple directories.  It will recurse
@@ -218,6 +265,131 @@ class TestIterSourceCode(TestCase):
         self.assertEqual(list(iterSourceCode([epath])),
                          [epath])
 
+    def test_exclude(self):
+        """
+        L{iterSourceCode} skips files and directories matching the exclude
+        patterns, without descending into excluded directories.
+        """
+        os.mkdir(os.path.join(self.tempdir, '.git'))
+        self.makeEmptyFile('.git', 'hook.py')
+        os.mkdir(os.path.join(self.tempdir, 'build'))
+        os.mkdir(os.path.join(self.tempdir, 'build', 'lib'))
+        self.makeEmptyFile('build', 'lib', 'a.py')
+        os.mkdir(os.path.join(self.tempdir, 'src'))
+        bpath = self.makeEmptyFile('src', 'b.py')
+        self.makeEmptyFile('src', 'b_pb2.py')
+        libpath = self.makeEmptyFile('src', 'lib.py')
+        self.assertEqual(
+            sorted(iterSourceCode(
+                [self.tempdir],
+                exclude=['.git', '*_pb2.py', os.path.join(self.tempdir, 'bu*')],
+            )),
+            sorted([bpath, libpath]))
+
+    def test_excludeExplicitFiles(self):
+        """
+        Files given explicitly to L{iterSourceCode} are not excluded.
+        """
+        epath = self.makeEmptyFile('e_pb2.py')
+        self.assertEqual(list(iterSourceCode([epath], exclude=['*_pb2.py'])),
+                         [epath])
+
+    def test_walkOrder(self):
+        """
+        L{iterSourceCode} finds files in the same order as C{os.walk}.
+        """
+        for d in ('a', 'b', os.path.join('a', 'c')):
+            os.mkdir(os.path.join(self.tempdir, d))
+            for f in ('x.py', 'y.py'):
+                self.makeEmptyFile(d, f)
+        self.makeEmptyFile('z.py')
+        expected = [
+            os.path.join(dirpath, filename)
+            for dirpath, _, filenames in os.walk(self.tempdir)
+            for filename in filenames
+        ]
+        self.assertEqual(list(iterSourceCode([self.tempdir])), expected)
+
+    def test_only(self):
+        """
+        L{iterSourceCode} given C{only} finds only those files, including
+        among the paths given explicitly.
+        """
+        os.mkdir(os.path.join(self.tempdir, 'a'))
+        os.mkdir(os.path.join(self.tempdir, 'b'))
+        apath = self.makeEmptyFile('a', 'x.py')
+        self.makeEmptyFile('a', 'y.py')
+        bpath = self.makeEmptyFile('b', 'x.py')
+        cpath = self.makeEmptyFile('c.py')
+        only = [apath, cpath, os.path.join(self.tempdir, 'gone.py')]
+        self.assertEqual(
+            sorted(iterSourceCode([self.tempdir, bpath, cpath], only=only)),
+            sorted([apath, cpath, cpath]))
+
+
+class TestIterChangedSourceCode(TestCase):
+    """
+    Tests for L{iterChangedSourceCode}.
+    """
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def writeFile(self, name, content):
+        fpath = os.path.join(self.tempdir, name)
+        with open(fpath, 'w') as fd:
+            fd.write(content)
+        return fpath
+
+    def test_changes(self):
+        """
+        L{iterChangedSourceCode} first yields all the files, then only the
+        ones which were added or changed.
+        """
+        apath = self.writeFile('a.py', 'a\n')
+        bpath = self.writeFile('b.py', 'b\n')
+        batches = iterChangedSourceCode([self.tempdir], interval=0)
+        self.assertEqual(sorted(next(batches)), [apath, bpath])
+
+        self.writeFile('b.py', 'bb\n')
+        self.assertEqual(next(batches), [bpath])
+
+        os.remove(apath)
+        cpath = self.writeFile('c.py', 'c\n')
+        self.assertEqual(next(batches), [cpath])
+
+    def test_unchanged(self):
+        """
+        Files are not yielded again when only their access time changed.
+        """
+        apath = self.writeFile('a.py', 'a\n')
+        bpath = self.writeFile('b.py', 'b\n')
+        batches = iterChangedSourceCode([apath, bpath], interval=0)
+        self.assertEqual(next(batches), [apath, bpath])
+
+        st = os.stat(apath)
+        os.utime(apath, ns=(st.st_atime_ns + 10 ** 9, st.st_mtime_ns))
+        self.writeFile('b.py', 'bb\n')
+        self.assertEqual(next(batches), [bpath])
+
+    @skipIf(not hasattr(os, 'symlink'), 'no symlinks')
+    def test_unreadable(self):
+        """
+        Files which cannot be stat'ed, such as dangling symlinks, are
+        yielded when they appear, but not again while they stay the same.
+        """
+        apath = self.writeFile('a.py', 'a\n')
+        dpath = os.path.join(self.tempdir, 'd.py')
+        os.symlink(os.path.join(self.tempdir, 'missing.py'), dpath)
+        batches = iterChangedSourceCode([apath, dpath], interval=0)
+        self.assertEqual(next(batches), [apath, dpath])
+
+        self.writeFile('a.py', 'aa\n')
+        self.assertEqual(next(batches), [apath])
+
 
 class TestReporter(TestCase):
     """
@@ -306,6 +478,155 @@ class TestReporter(TestCase):
         self.assertEqual(out.getvalue(), f"{message}\n")
 
 
+@skipIf(shutil.which('git') is None, 'git is not installed')
+class TestGitChanges(TestCase):
+    """
+    Tests for L{gitChanges} and the options using it.
+    """
+
+    def setUp(self):
+        self.tempdir = os.path.realpath(tempfile.mkdtemp())
+        cwd = os.getcwd()
+        os.chdir(self.tempdir)
+        self.addCleanup(os.chdir, cwd)
+        self.git('init', '-q')
+        self.writeFile('a.py', 'import os\nimport sys\nsys\n')
+        self.writeFile('b.py', 'import os\n')
+        os.mkdir('sub')
+        self.writeFile(os.path.join('sub', 'c.py'), 'x = 1\n')
+        self.git('add', '.')
+        self.git('commit', '-q', '-m', 'base')
+        self.git('branch', 'base')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def git(self, *args):
+        subprocess.run(
+            ('git', '-c', 'user.name=test', '-c', 'user.email=test@example.com',
+             '-c', 'commit.gpgsign=false') + args,
+            check=True, stdout=subprocess.DEVNULL)
+
+    def writeFile(self, name, content):
+        with open(os.path.join(self.tempdir, name), 'w') as fd:
+            fd.write(content)
+
+    def makeChanges(self):
+        self.writeFile('a.py', 'import os\nimport re\nimport sys\nsys\n')
+        self.git('commit', '-q', '-am', 'change a')
+        # Uncommitted changes count too
+        self.writeFile(os.path.join('sub', 'c.py'), 'x = 1\nimport json\n')
+        self.writeFile('README', 'readme\n')
+        self.git('add', 'README')
+        os.remove('b.py')
+
+    def test_files(self):
+        """
+        L{gitChanges} finds the files changed since the base, committed or
+        not, leaving out deleted files.
+        """
+        self.makeChanges()
+        self.assertEqual(gitChanges('base'), {
+            os.path.join(self.tempdir, 'a.py'): None,
+            os.path.join(self.tempdir, 'README'): None,
+            os.path.join(self.tempdir, 'sub', 'c.py'): None,
+        })
+
+    def test_lines(self):
+        """
+        L{gitChanges} can find the changed lines of the files, relative to
+        the top of the work tree whatever the current directory.
+        """
+        self.makeChanges()
+        os.chdir('sub')
+        self.assertEqual(gitChanges('base', lines=True), {
+            os.path.join(self.tempdir, 'a.py'): {2},
+            os.path.join(self.tempdir, 'README'): {1},
+            os.path.join(self.tempdir, 'sub', 'c.py'): {2},
+        })
+
+    def test_linesNameWithSpace(self):
+        """
+        L{gitChanges} finds the changed lines of files with a space in their
+        name.
+        """
+        self.writeFile('my file.py', 'import os\n')
+        self.git('add', 'my file.py')
+        self.assertEqual(gitChanges('base', lines=True), {
+            os.path.join(self.tempdir, 'my file.py'): {1},
+        })
+
+    def test_linesQuotedName(self):
+        """
+        L{gitChanges} finds the changed lines of files whose names git
+        quotes in diffs.
+        """
+        for name in ('a "b".py', 'c\\d.py', '\u00e9.py'):
+            self.writeFile(name, 'import os\n')
+        self.git('add', '.')
+        self.assertEqual(gitChanges('base', lines=True), {
+            os.path.join(self.tempdir, 'a "b".py'): {1},
+            os.path.join(self.tempdir, 'c\\d.py'): {1},
+            os.path.join(self.tempdir, '\u00e9.py'): {1},
+        })
+
+    def test_untracked(self):
+        """
+        L{gitChanges} counts new files which are not ignored as changed,
+        with all their lines.
+        """
+        self.writeFile('.gitignore', 'ignored.py\n')
+        self.writeFile('ignored.py', 'import os\n')
+        self.writeFile(os.path.join('sub', 'new.py'), 'import os\nos\n')
+        os.chdir('sub')
+        new = os.path.join(self.tempdir, 'sub', 'new.py')
+        gitignore = os.path.join(self.tempdir, '.gitignore')
+        self.assertEqual(gitChanges('base'), {gitignore: None, new: None})
+        self.assertEqual(gitChanges('base', lines=True),
+                         {gitignore: {1, 2}, new: {1, 2, 3}})
+
+    def test_main(self):
+        """
+        With C{--diff-base}, only changed files are checked, and with
+        C{--diff-lines-only} only warnings about changed lines are reported.
+        """
+        self.makeChanges()
+        results = []
+        for args in (['--diff-base', 'base'],
+                     ['--diff-base', 'base', '--diff-lines-only'],
+                     ['--diff-base', 'base', '--diff-lines-only', 'sub']):
+            with SysStreamCapturing(None) as capture:
+                try:
+                    main(args=args)
+                except SystemExit as e:
+                    code = e.code
+            results.append((sorted(capture.output.splitlines()), code))
+
+        apath = os.path.join(os.curdir, 'a.py')
+        cpath = os.path.join(os.curdir, 'sub', 'c.py')
+        self.assertEqual(results, [
+            ([f"{apath}:1:1: 'os' imported but unused",
+              f"{apath}:2:1: 're' imported but unused",
+              f"{cpath}:2:1: 'json' imported but unused"], True),
+            ([f"{apath}:2:1: 're' imported but unused",
+              f"{cpath}:2:1: 'json' imported but unused"], True),
+            ([f"{os.path.join('sub', 'c.py')}:2:1: "
+              "'json' imported but unused"], True),
+        ])
+
+    def test_noChanges(self):
+        """
+        Nothing is checked when nothing changed.
+        """
+        with SysStreamCapturing(None) as capture:
+            try:
+                main(args=['--diff-base', 'base'])
+            except SystemExit as e:
+                code = e.code
+        self.assertEqual((capture.output, capture.error, code),
+                         ('', '', False))
+
+
 class CheckTests(TestCase):
     """
     Tests for L{check} and L{checkPath} which check a file for flakes.
@@ -643,6 +964,114 @@ x = "%s"
         finally:
             shutil.rmtree(tempdir)
 
+    def test_checkRecursiveJobs(self):
+        """
+        L{checkRecursive} given several jobs reports the same warnings in the
+        same order as when it checks the files one at a time.
+        """
+        tempdir = tempfile.mkdtemp()
+        try:
+            for i in range(10):
+                with open(os.path.join(tempdir, f'm{i}.py'), 'wb') as fd:
+                    fd.write(b"import os%d\nimport sys\n" % i)
+            with open(os.path.join(tempdir, 'broken.py'), 'wb') as fd:
+                fd.write(b"def f(\n")
+            serial = []
+            serialWarnings = checkRecursive(
+                [tempdir], LoggingReporter(serial))
+            parallel = []
+            parallelWarnings = checkRecursive(
+                [tempdir], LoggingReporter(parallel), jobs=3)
+            self.assertEqual(serialWarnings, 21)
+            self.assertEqual(parallelWarnings, serialWarnings)
+            self.assertEqual(parallel, serial)
+        finally:
+            shutil.rmtree(tempdir)
+
+    def test_maxSize(self):
+        """
+        L{checkPath} skips files larger than C{maxSize}, with a notice which
+        does not count as a warning.
+        """
+        with self.makeTempFile("import os\n") as fName:
+            log = []
+            count = checkPath(fName, LoggingReporter(log), maxSize=5)
+            self.assertEqual((count, log), (0, [
+                ('unexpectedError', fName, 'skipped, larger than 5 bytes'),
+            ]))
+            log = []
+            count = checkPath(fName, LoggingReporter(log), maxSize=10)
+            self.assertEqual(count, 1)
+            self.assertEqual(log[0][0], 'flake')
+
+    def test_timeout(self):
+        """
+        L{check} gives up when checking takes longer than C{timeout}, with a
+        notice which does not count as a warning.
+        """
+        source = "import os\n" + "x = y\n" * 2000
+        log = []
+        count = check(source, 'a.py', LoggingReporter(log), timeout=0)
+        self.assertEqual((count, log), (0, [
+            ('unexpectedError', 'a.py',
+             'skipped, checking took longer than 0 seconds'),
+        ]))
+        self.assertEqual(check(source, 'a.py', LoggingReporter([]),
+                               timeout=60), 2001)
+
+    def test_checkMany(self):
+        """
+        L{checkMany} returns the messages, syntax errors and other errors of
+        each source, in order, whatever the number of jobs.
+        """
+        sources = [
+            ("import os\nimport sys\nsys\n", 'a.py'),
+            ("def f(\n", 'b.py'),
+            ("x = 1\n", 'c.py'),
+            (b"\xef\xbb\xbfx = 1\xff\n", 'd.py'),
+        ] * 3
+        for jobs in (1, 2):
+            results = list(checkMany(iter(sources), jobs=jobs))
+            self.assertEqual([r.filename for r in results],
+                             [filename for _, filename in sources])
+            a, b, c, d = results[:4]
+            self.assertEqual([str(m) for m in a.messages],
+                             ["a.py:1:1: 'os' imported but unused"])
+            self.assertIsNone(a.syntaxError)
+            self.assertIsNone(a.error)
+            self.assertEqual(b.messages, [])
+            self.assertEqual(b.syntaxError[1], 1)
+            self.assertEqual((c.messages, c.syntaxError, c.error),
+                             ([], None, None))
+            self.assertIsNotNone(d.syntaxError or d.error)
+            self.assertTrue(all(r.time >= 0 for r in results))
+
+    def test_checkManyWindowsJobs(self):
+        """
+        On Windows, L{checkMany} uses no more worker processes than
+        C{ProcessPoolExecutor} accepts there.
+        """
+        import concurrent.futures
+
+        workers = []
+
+        class Executor(concurrent.futures.ThreadPoolExecutor):
+            def __init__(self, max_workers):
+                if max_workers > 61:
+                    raise ValueError('max_workers must be <= 61')
+                workers.append(max_workers)
+                super().__init__(max_workers)
+
+        self.addCleanup(setattr, concurrent.futures, 'ProcessPoolExecutor',
+                        concurrent.futures.ProcessPoolExecutor)
+        self.addCleanup(setattr, sys, 'platform', sys.platform)
+        concurrent.futures.ProcessPoolExecutor = Executor
+        sys.platform = 'win32'
+        results = list(checkMany([("import os\n", 'a.py')], jobs=64))
+        self.assertEqual(workers, [61])
+        self.assertEqual([str(m) for m in results[0].messages],
+                         ["a.py:1:1: 'os' imported but unused"])
+
     def test_stdinReportsErrors(self):
         """
         L{check} reports syntax errors from stdin
@@ -661,6 +1090,149 @@ x = "%s"
         self.assertEqual(errlines, expected_error)
 
 
+class TestResultCache(TestCase):
+    """
+    Tests for L{ResultCache} and its use by L{checkPath}.
+    """
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.cacheDir = os.path.join(self.tempdir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def makeFile(self, name, content):
+        path = os.path.join(self.tempdir, name)
+        with open(path, 'wb') as fd:
+            fd.write(content)
+        return path
+
+    def check(self, path, cache):
+        log = []
+        count = checkPath(path, LoggingReporter(log), cache)
+        return count, log
+
+    def test_hit(self):
+        """
+        Checking an unchanged file a second time replays the cached results,
+        even with another cache instance.
+        """
+        path = self.makeFile('a.py', b"import contraband\ndef f(:\n")
+        first = self.check(path, ResultCache(self.cacheDir))
+        cache = ResultCache(self.cacheDir)
+        self.assertEqual(self.check(path, cache), first)
+        self.assertEqual(self.check(path, None), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+    def test_hitReadOnly(self):
+        """
+        Entries which cannot be touched, as in a read-only cache, are still
+        hits.
+        """
+        path = self.makeFile('a.py', b"import contraband\n")
+        first = self.check(path, ResultCache(self.cacheDir))
+
+        def utime(path):
+            raise PermissionError(path)
+        self.addCleanup(setattr, os, 'utime', os.utime)
+        os.utime = utime
+        cache = ResultCache(self.cacheDir)
+        self.assertEqual(self.check(path, cache), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+    def test_timeoutNotCached(self):
+        """
+        Files which took too long to check are not cached.
+        """
+        path = self.makeFile('a.py', b"x = y\n" * 2000)
+        cache = ResultCache(self.cacheDir)
+        log = []
+        count = checkPath(path, LoggingReporter(log), cache, timeout=0)
+        self.assertEqual(count, 0)
+        self.assertEqual([entry[0] for entry in log], ['unexpectedError'])
+        self.assertEqual(self.check(path, cache)[0], 2000)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_changedContent(self):
+        """
+        A file whose content changed is checked again.
+        """
+        path = self.makeFile('a.py', b"import contraband\n")
+        cache = ResultCache(self.cacheDir)
+        self.check(path, cache)
+        self.makeFile('a.py', b"import contraband, smuggled\n")
+        count, log = self.check(path, cache)
+        self.assertEqual(count, 2)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_sameContentOtherFile(self):
+        """
+        The results for a file with the same content as one already cached
+        are reported against the right filename.
+        """
+        cache = ResultCache(self.cacheDir)
+        self.check(self.makeFile('a.py', b"import contraband\n"), cache)
+        path = self.makeFile('b.py', b"import contraband\n")
+        self.assertEqual(
+            self.check(path, cache),
+            (1, [('flake', str(UnusedImport(path, Node(1), 'contraband')))]))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_sameContentPackage(self):
+        """
+        A package's C{__init__.py} is not given the cached results of a
+        module with the same content, as they are checked differently.
+        """
+        cache = ResultCache(self.cacheDir)
+        source = b"__all__ = ['foo']\n"
+        self.check(self.makeFile('b.py', source), cache)
+        os.mkdir(os.path.join(self.tempdir, 'a'))
+        path = self.makeFile(os.path.join('a', '__init__.py'), source)
+        self.assertEqual(self.check(path, cache), self.check(path, None))
+        self.assertEqual(self.check(path, None), (0, []))
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_checkRecursiveJobs(self):
+        """
+        Cache hits and misses in worker processes are counted by the cache
+        passed to L{checkRecursive}.
+        """
+        for name in ('a.py', 'b.py', 'c.py'):
+            self.makeFile(name, name.encode('ascii'))
+        cache = ResultCache(self.cacheDir)
+        checkRecursive([self.tempdir], LoggingReporter([]), 2, cache)
+        checkRecursive([self.tempdir], LoggingReporter([]), 2, cache)
+        self.assertEqual((cache.hits, cache.misses), (3, 3))
+
+    def test_prune(self):
+        """
+        L{ResultCache.prune} removes the least recently used entries beyond
+        the maximum size.
+        """
+        cache = ResultCache(self.cacheDir, maxSize=0)
+        for i in range(3):
+            key = cache.key(b'%d' % i, 'a.py')
+            cache.put(key, 0, [])
+            os.utime(os.path.join(self.cacheDir, key), (i, i))
+        size = os.path.getsize(os.path.join(self.cacheDir, key))
+        cache.maxSize = size
+        cache.prune()
+        self.assertEqual(os.listdir(self.cacheDir), [key])
+        self.assertEqual(cache.evictions, 2)
+
+    def test_importedOnlyWhenUsed(self):
+        """
+        L{pyflakes.api} only imports L{pyflakes.cache} when a cache is used,
+        with the same default size.
+        """
+        code = ('import sys, pyflakes.api; '
+                'sys.exit("pyflakes.cache" in sys.modules)')
+        self.assertEqual(subprocess.run([sys.executable, '-c', code]).returncode,
+                         0)
+        self.assertEqual(api.DEFAULT_CACHE_MAX_SIZE, modCache.DEFAULT_MAX_SIZE)
+
+
 class IntegrationTests(TestCase):
     """
     Tests of the pyflakes script that actually spawn the script.
@@ -756,6 +1328,24 @@ class IntegrationTests(TestCase):
             self.tempfilepath, message, os.linesep)
         self.assertEqual(d, ('', error_msg, 1))
 
+    def test_jobs(self):
+        """
+        Checking files in several processes gives the same output and return
+        code as checking them one at a time.
+        """
+        paths = []
+        for name in ('a.py', 'b.py', 'c.py'):
+            path = os.path.join(self.tempdir, name)
+            with open(path, 'wb') as fd:
+                fd.write(b"import contraband\n")
+            paths.append(path)
+        d = self.runPyflakes(['-j', '2'] + paths)
+        expected = ''.join(
+            f"{UnusedImport(path, Node(1), 'contraband')}{os.linesep}"
+            for path in paths
+        )
+        self.assertEqual(d, (expected, '', 1))
+
     def test_readFromStdin(self):
         """
         If no arguments are passed to C{pyflakes} then it reads from stdin.
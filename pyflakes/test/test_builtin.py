@@ -2,6 +2,7 @@
 Tests for detecting redefinition of builtins.
 """
 from pyflakes import messages as m
+from pyflakes.checker import Builtin, ModuleScope
 from pyflakes.test.harness import TestCase
 
 
@@ -28,3 +29,33 @@ class TestBuiltins(TestCase):
 
         f()
         ''')
+
+    def test_deleted_builtin(self):
+        self.flakes('''
+        del range
+        range(3)
+        ''', m.UndefinedName)
+
+    def test_deleted_used_builtin(self):
+        self.flakes('''
+        range(3)
+        del range
+        range(3)
+        ''', m.UndefinedName)
+
+    def test_exported_builtin(self):
+        self.flakes('''
+        __all__ = ['range', 'nope']
+        ''', m.UndefinedExport)
+
+    def test_only_used_builtins_bound(self):
+        """
+        Builtins are only bound in the module scope once their name is used.
+        """
+        w = self.flakes('''
+        import os
+        len(os.sep)
+        ''')
+        [scope] = [s for s in w.deadScopes if isinstance(s, ModuleScope)]
+        self.assertEqual(sorted(scope), ['len', 'os'])
+        self.assertIsInstance(scope['len'], Builtin)
@@ -0,0 +1,182 @@
+"""
+Tests for L{pyflakes.daemon}.
+"""
+import os
+import shutil
+import socket
+import tempfile
+import threading
+
+from pyflakes import daemon
+from pyflakes.test.harness import TestCase, skipIf
+from pyflakes.test.test_api import SysStreamCapturing
+
+
+@skipIf(not hasattr(socket, 'AF_UNIX'), 'no Unix domain sockets')
+class TestDaemon(TestCase):
+    """
+    Tests for the daemon and its client.
+    """
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.address = os.path.join(self.tempdir, 'daemon.sock')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def startServer(self):
+        server = daemon._makeServer(self.address)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            thread.join()
+            server.server_close()
+        self.addCleanup(stop)
+        return server
+
+    def runClient(self, args, stdin=None):
+        """
+        Run the client, returning its output and exit status.
+        """
+        try:
+            with SysStreamCapturing(stdin) as capture:
+                daemon.main(['--socket', self.address] + args)
+        except SystemExit as e:
+            return (capture.output, capture.error, int(e.code))
+        else:
+            raise RuntimeError('SystemExit not raised')
+
+    def makeFile(self, name, content):
+        path = os.path.join(self.tempdir, name)
+        with open(path, 'w') as fd:
+            fd.write(content)
+        return path
+
+    def test_sameAsLocal(self):
+        """
+        The output and exit status of the client are those of checking the
+        files locally, which is what the client does without a daemon.
+        """
+        good = self.makeFile('good.py', 'import os\nos\n')
+        bad = self.makeFile('bad.py', 'import contraband\n')
+        broken = self.makeFile('broken.py', 'def f(:\n')
+        missing = os.path.join(self.tempdir, 'missing.py')
+
+        local = [
+            self.runClient([good]),
+            self.runClient([good, bad, broken, missing]),
+            self.runClient([], stdin='import contraband\n'),
+            self.runClient(['--no-such-option']),
+        ]
+        self.startServer()
+        remote = [
+            self.runClient([good]),
+            self.runClient([good, bad, broken, missing]),
+            self.runClient([], stdin='import contraband\n'),
+            self.runClient(['--no-such-option']),
+        ]
+        self.assertEqual(remote, local)
+        self.assertEqual(local[0], ('', '', 0))
+        self.assertEqual(local[1][2], 1)
+
+    def test_served(self):
+        """
+        Requests are answered by the daemon when one is running.
+        """
+        self.startServer()
+        path = self.makeFile('bad.py', 'import contraband\n')
+        response = daemon._request(self.address, {
+            'args': [path],
+            'cwd': os.getcwd(),
+            'env': daemon._environment(),
+        })
+        self.assertEqual(response['status'], 1)
+        self.assertIn("'contraband' imported but unused", response['stdout'])
+
+    def test_environmentMismatch(self):
+        """
+        The daemon refuses requests from clients with another pyflakes
+        environment.
+        """
+        self.startServer()
+        env = dict(daemon._environment(), PYFLAKES_BUILTINS='foo')
+        response = daemon._request(self.address, {
+            'args': [],
+            'cwd': os.getcwd(),
+            'env': env,
+        })
+        self.assertIsNone(response)
+
+    def test_localOptions(self):
+        """
+        The daemon refuses to run options which keep pyflakes running, even
+        abbreviated.
+        """
+        for args in (['--daemon'], ['--da'], ['--l'], ['--watch', 'a.py']):
+            response = daemon._run({'args': args, 'cwd': os.getcwd(),
+                                    'env': daemon._environment()}, None)
+            self.assertEqual(response,
+                             {'error': 'these options only work locally'})
+        for args in ([], ['--wat'], ['--help'], ['a.py']):
+            self.assertFalse(daemon._runsLocally(args))
+
+    def test_otherUsersSocket(self):
+        """
+        The client does not talk to a socket which belongs to another user,
+        and checks the files itself.
+        """
+        self.startServer()
+        getuid = os.getuid
+        os.getuid = lambda: getuid() + 1
+        self.addCleanup(setattr, os, 'getuid', getuid)
+        response = daemon._request(self.address, {
+            'args': [],
+            'cwd': os.getcwd(),
+            'env': daemon._environment(),
+        })
+        self.assertIsNone(response)
+
+    def test_privateDirectory(self):
+        """
+        The directory of the default socket is created for the current user
+        only, and is refused when others can use it.
+        """
+        directory = os.path.join(self.tempdir, 'private')
+        daemon._makePrivateDirectory(directory)
+        self.assertEqual(os.stat(directory).st_mode & 0o777, 0o700)
+        daemon._makePrivateDirectory(directory)
+        os.chmod(directory, 0o777)
+        self.assertRaises(SystemExit, daemon._makePrivateDirectory, directory)
+
+    def test_defaultAddress(self):
+        """
+        The default socket is in C{$XDG_RUNTIME_DIR} when it is set, and in a
+        per-user directory otherwise.
+        """
+        environ = dict(os.environ)
+
+        def restore():
+            os.environ.clear()
+            os.environ.update(environ)
+        self.addCleanup(restore)
+        os.environ.pop('PYFLAKES_DAEMON_SOCKET', None)
+        os.environ['XDG_RUNTIME_DIR'] = self.tempdir
+        self.assertEqual(daemon.defaultAddress(),
+                         os.path.join(self.tempdir, 'pyflakes.sock'))
+        del os.environ['XDG_RUNTIME_DIR']
+        self.assertEqual(os.path.dirname(daemon.defaultAddress()),
+                         daemon._userDirectory())
+
+    def test_staleSocket(self):
+        """
+        A socket left behind by a daemon which is no longer running does not
+        prevent a new daemon from starting.
+        """
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.bind(self.address)
+        self.startServer()
+        self.assertEqual(self.runClient([self.makeFile('a.py', '')]),
+                         ('', '', 0))
@@ -1,3 +1,5 @@
+import subprocess
+import sys
 import textwrap
 
 from pyflakes import messages as m
@@ -351,6 +353,50 @@ class Test(TestCase):
         self.assertEqual(exc.lineno, 5)
         self.assertEqual(exc.col, 13)
 
+    def test_statementAcrossExamples(self):
+        """
+        Examples are parsed separately, even where their sources would parse
+        together.
+        """
+        exceptions = self.flakes('''
+        def doctest_stuff():
+            """
+                >>> print(
+                >>> )
+                >>> undefined
+            """
+        ''', m.DoctestSyntaxError, m.DoctestSyntaxError,
+                                 m.UndefinedName).messages
+        self.assertEqual([exc.lineno for exc in exceptions], [4, 5, 6])
+
+    def test_offsetInLaterExamples(self):
+        """
+        Warnings in examples after the first, including multi-line and more
+        indented ones, are reported at their place in the docstring.
+        """
+        exceptions = self.flakes('''
+        def doctest_stuff():
+            """
+                >>> a = [
+                ...     1]
+                >>> # comment
+                  >>> def f():
+                  ...     return x
+                >>> y
+            """
+        ''', m.UndefinedName, m.UndefinedName).messages
+        self.assertEqual(sorted((exc.lineno, exc.col) for exc in exceptions),
+                         [(8, 25), (9, 12)])
+
+    def test_doctestImportedLazily(self):
+        """
+        Importing the checker does not import L{doctest}.
+        """
+        code = ('import sys, pyflakes.checker; '
+                'sys.exit("doctest" in sys.modules)')
+        self.assertEqual(subprocess.run([sys.executable, '-c', code]).returncode,
+                         0)
+
     def test_offsetWithMultiLineArgs(self):
         (exc1, exc2) = self.flakes(
             '''
@@ -1135,6 +1135,25 @@ class TestSpecialAll(TestCase):
         csc(1)
         ''', m.ImportStarUsed, m.ImportStarUsage, m.ImportStarUsage, m.ImportStarUsage)
 
+    def test_importStarSources(self):
+        """
+        Names which may come from star imports are reported with the sorted
+        list of the star imported modules, which are all used.
+        """
+        checker = self.flakes('''
+        from math import *
+        from .cmath import *
+        from math import *
+        __all__ = ['sin']
+        csc(1)
+        ''', m.ImportStarUsed, m.ImportStarUsed, m.ImportStarUsed,
+                              m.RedefinedWhileUnused, m.ImportStarUsage,
+                              m.ImportStarUsage)
+        self.assertEqual(
+            [error.message_args for error in checker.messages
+             if isinstance(error, m.ImportStarUsage)],
+            [('csc', '.cmath, math'), ('sin', '.cmath, math')])
+
     def test_importStarNotExported(self):
         """Report unused import when not needed to satisfy __all__."""
         self.flakes('''
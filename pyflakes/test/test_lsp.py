@@ -0,0 +1,271 @@
+"""
+Tests for L{pyflakes.lsp}.
+"""
+import io
+
+from pyflakes import lsp
+from pyflakes.test.harness import TestCase
+
+
+def frame(*messages):
+    """
+    Encode C{messages} as the client would send them.
+    """
+    stream = io.BytesIO()
+    for message in messages:
+        lsp._writeMessage(stream, dict(message, jsonrpc='2.0'))
+    return stream.getvalue()
+
+
+def parse(data):
+    """
+    Decode what the server sent.
+    """
+    stream = io.BytesIO(data)
+    messages = []
+    while True:
+        message = lsp._readMessage(stream)
+        if message is None:
+            return messages
+        messages.append(message)
+
+
+def didOpen(uri, text):
+    return {'method': 'textDocument/didOpen',
+            'params': {'textDocument': {'uri': uri, 'languageId': 'python',
+                                        'version': 1, 'text': text}}}
+
+
+def didChange(uri, text):
+    return {'method': 'textDocument/didChange',
+            'params': {'textDocument': {'uri': uri},
+                       'contentChanges': [{'text': text}]}}
+
+
+def didSave(uri):
+    return {'method': 'textDocument/didSave',
+            'params': {'textDocument': {'uri': uri}}}
+
+
+def didClose(uri):
+    return {'method': 'textDocument/didClose',
+            'params': {'textDocument': {'uri': uri}}}
+
+
+SHUTDOWN = ({'id': 99, 'method': 'shutdown'}, {'method': 'exit'})
+
+
+class TestLanguageServer(TestCase):
+    """
+    Tests for L{lsp.LanguageServer}.
+    """
+
+    def runServer(self, *messages, delay=0):
+        """
+        Run a server on C{messages}.
+
+        @return: The exit status, and the messages the server sent.
+        """
+        out = io.BytesIO()
+        server = lsp.LanguageServer(io.BytesIO(frame(*messages)), out,
+                                    delay=delay)
+        status = server.run()
+        return status, parse(out.getvalue())
+
+    def published(self, messages):
+        """
+        Return the diagnostics published in C{messages}, as tuples of the URI
+        and the text of the diagnostics.
+        """
+        return [
+            (m['params']['uri'],
+             [d['message'] for d in m['params']['diagnostics']])
+            for m in messages
+            if m.get('method') == 'textDocument/publishDiagnostics'
+        ]
+
+    def test_initialize(self):
+        """
+        The server answers the initialize and shutdown requests, and exits
+        with a status of 0 after a shutdown.
+        """
+        status, messages = self.runServer(
+            {'id': 1, 'method': 'initialize', 'params': {}}, *SHUTDOWN)
+        self.assertEqual(status, 0)
+        self.assertEqual([m['id'] for m in messages], [1, 99])
+        sync = messages[0]['result']['capabilities']['textDocumentSync']
+        self.assertEqual(sync['change'], 1)
+        self.assertIsNone(messages[1]['result'])
+
+    def test_exitWithoutShutdown(self):
+        """
+        The exit status is 1 when the client exits without a shutdown.
+        """
+        status, messages = self.runServer({'method': 'exit'})
+        self.assertEqual(status, 1)
+        self.assertEqual(messages, [])
+
+    def test_unknownRequest(self):
+        """
+        Unsupported requests get an error, unsupported notifications are
+        ignored.
+        """
+        status, messages = self.runServer(
+            {'id': 1, 'method': 'textDocument/hover', 'params': {}},
+            {'method': '$/unknown'},
+            *SHUTDOWN)
+        self.assertEqual(messages[0]['id'], 1)
+        self.assertEqual(messages[0]['error']['code'], -32601)
+
+    def test_diagnostics(self):
+        """
+        Opening a document publishes its warnings, with LSP positions.
+        """
+        status, messages = self.runServer(
+            didOpen('file:///a.py', 'import os\né = x\n'),
+            *SHUTDOWN)
+        [diagnostics] = [m['params']['diagnostics'] for m in messages
+                         if 'params' in m]
+        self.assertEqual(
+            [(d['range']['start'], d['message'], d['code'])
+             for d in diagnostics],
+            [({'line': 0, 'character': 0}, "'os' imported but unused",
+              'UnusedImport'),
+             ({'line': 1, 'character': 4}, "undefined name 'x'",
+              'UndefinedName')])
+
+    def test_syntaxError(self):
+        """
+        Syntax errors are published as errors.
+        """
+        status, messages = self.runServer(
+            didOpen('file:///a.py', 'def f(:\n'), *SHUTDOWN)
+        [diagnostic] = messages[0]['params']['diagnostics']
+        self.assertEqual(diagnostic['severity'], 1)
+        self.assertEqual(diagnostic['range']['start']['line'], 0)
+
+    def test_changes(self):
+        """
+        Changes are published, unless the warnings stay the same.
+        """
+        uri = 'file:///a.py'
+        status, messages = self.runServer(
+            didOpen(uri, 'import os\n'),
+            didChange(uri, 'import os\n\n'),
+            didChange(uri, 'import sys\n'),
+            *SHUTDOWN)
+        self.assertEqual(self.published(messages), [
+            (uri, ["'os' imported but unused"]),
+            (uri, ["'sys' imported but unused"]),
+        ])
+
+    def test_debounce(self):
+        """
+        A burst of changes is checked once, here when the document is saved.
+        """
+        uri = 'file:///a.py'
+        checked = []
+        original = lsp._diagnostics
+
+        def diagnostics(text, filename):
+            checked.append(text)
+            return original(text, filename)
+        lsp._diagnostics = diagnostics
+        self.addCleanup(setattr, lsp, '_diagnostics', original)
+
+        status, messages = self.runServer(
+            didOpen(uri, 'import os\n'),
+            didChange(uri, 'import o\n'),
+            didChange(uri, 'import sy\n'),
+            didChange(uri, 'import sys\n'),
+            didSave(uri),
+            didSave(uri),
+            *SHUTDOWN,
+            delay=60)
+        self.assertEqual(checked, ['import os\n', 'import sys\n'])
+        self.assertEqual(self.published(messages), [
+            (uri, ["'os' imported but unused"]),
+            (uri, ["'sys' imported but unused"]),
+        ])
+
+    def test_close(self):
+        """
+        Closing a document clears its diagnostics, and it is not checked
+        any more.
+        """
+        uri = 'file:///a.py'
+        status, messages = self.runServer(
+            didOpen(uri, 'import os\n'),
+            didChange(uri, 'import sys\n'),
+            didClose(uri),
+            didChange(uri, 'import re\n'),
+            didSave(uri),
+            *SHUTDOWN,
+            delay=60)
+        self.assertEqual(self.published(messages), [
+            (uri, ["'os' imported but unused"]),
+            (uri, []),
+        ])
+
+    def test_badNotification(self):
+        """
+        A notification which cannot be handled is dropped, and the server
+        goes on.
+        """
+        uri = 'file:///a.py'
+        status, messages = self.runServer(
+            {'method': 'textDocument/didOpen',
+             'params': {'textDocument': {'uri': uri}}},
+            didOpen(uri, 'import os\n'),
+            *SHUTDOWN)
+        self.assertEqual(status, 0)
+        self.assertEqual(self.published(messages), [
+            (uri, ["'os' imported but unused"]),
+        ])
+        self.assertEqual(messages[-1]['id'], 99)
+
+    def test_badRequest(self):
+        """
+        A request with parameters which cannot be handled gets an invalid
+        parameters error, and one which fails otherwise an internal error.
+        """
+        def diagnostics(text, filename):
+            raise RuntimeError('boom')
+        original = lsp._diagnostics
+        lsp._diagnostics = diagnostics
+        self.addCleanup(setattr, lsp, '_diagnostics', original)
+
+        status, messages = self.runServer(
+            {'id': 1, 'method': 'textDocument/didOpen', 'params': {}},
+            dict(didOpen('file:///a.py', 'import os\n'), id=2),
+            *SHUTDOWN)
+        self.assertEqual(status, 0)
+        self.assertEqual(
+            [(m['id'], m['error']['code']) for m in messages[:2]],
+            [(1, -32602), (2, -32603)])
+        self.assertEqual(messages[2]['id'], 99)
+
+    def test_failingCheck(self):
+        """
+        A delayed check which fails does not stop the server.
+        """
+        uri = 'file:///a.py'
+        original = lsp._diagnostics
+
+        def diagnostics(text, filename):
+            if text == 'import sys\n':
+                raise RuntimeError('boom')
+            return original(text, filename)
+        lsp._diagnostics = diagnostics
+        self.addCleanup(setattr, lsp, '_diagnostics', original)
+
+        status, messages = self.runServer(
+            didOpen(uri, 'import os\n'),
+            didChange(uri, 'import sys\n'),
+            {'id': 1, 'method': 'initialize', 'params': {}},
+            *SHUTDOWN)
+        self.assertEqual(status, 0)
+        self.assertEqual(self.published(messages), [
+            (uri, ["'os' imported but unused"]),
+        ])
+        self.assertEqual([m.get('id') for m in messages[1:]], [1, 99])
@@ -2,8 +2,10 @@
 Tests for various Pyflakes behavior.
 """
 
+import ast
 from sys import version_info
 
+from pyflakes import checker
 from pyflakes import messages as m
 from pyflakes.test.harness import TestCase, skip, skipIf
 
@@ -1970,6 +1972,41 @@ class TestStringFormatting(TestCase):
             '%(k)s' % {**k}
         ''')
 
+    def test_parse_percent_format(self):
+        parse = checker.parse_percent_format
+        self.assertEqual(parse(''), ())
+        self.assertEqual(parse('%s'), (('', (None, None, None, None, 's')),))
+        self.assertEqual(parse('a%%b'), (
+            ('a', (None, None, None, None, '%')),
+            ('b', None),
+        ))
+        self.assertEqual(parse('%(key)#-10.*lf %(x'), (
+            ('', ('key', '#-', '10', '.*', 'f')),
+            (' ', (None, None, None, None, '(')),
+            ('x', None),
+        ))
+        self.assertEqual(parse('%()s\n%\n'), (
+            ('', ('', None, None, None, 's')),
+            ('\n', (None, None, None, None, '\n')),
+        ))
+        with self.assertRaises(ValueError):
+            parse('%.2')
+
+    def test_repeated_format_strings(self):
+        """
+        Format strings seen before give the same warnings.
+        """
+        for _ in range(2):
+            self.flakes('''
+                '%s %s' % (1,)
+                '%(a)s %' % {'a': 1}
+                '{} {'.format(1)
+                '{0:{1}}'.format(1)
+            ''', m.PercentFormatPositionalCountMismatch,
+                        m.PercentFormatInvalidFormat,
+                        m.StringDotFormatInvalidFormat,
+                        m.StringDotFormatMissingArgument)
+
 
 class TestAsyncStatements(TestCase):
 
@@ -2148,3 +2185,311 @@ class TestIncompatiblePrintOperator(TestCase):
         from __future__ import print_function
         if print: pass
         ''')
+
+
+class TestNodeHandlers(TestCase):
+    """
+    Tests for the node handler table of L{checker.Checker}.
+    """
+
+    def test_subclass(self):
+        """
+        Handlers added by a subclass are used by its instances only.
+        """
+        seen = []
+
+        class Subclass(checker.Checker):
+            def PASS(self, node):
+                seen.append(node)
+
+        tree = ast.parse('pass\n')
+        checker.Checker(tree)
+        self.assertEqual(seen, [])
+        Subclass(tree)
+        self.assertEqual(seen, [tree.body[0]])
+        self.assertIsNot(Subclass._nodeHandlers, checker.Checker._nodeHandlers)
+
+    def test_getNodeHandler(self):
+        """
+        L{checker.Checker.getNodeHandler} returns bound handlers, falling back
+        on the handler of unknown nodes.
+        """
+        instance = checker.Checker(ast.parse(''))
+        self.assertEqual(instance.getNodeHandler(ast.Pass),
+                         instance.ignore)
+
+        class Unknown(ast.AST):
+            pass
+        self.assertEqual(instance.getNodeHandler(Unknown),
+                         instance._unknown_handler)
+
+
+class TestDeepTrees(TestCase):
+    """
+    Deeply nested expressions are checked without hitting the recursion
+    limit.
+    """
+
+    def test_binOpChain(self):
+        self.flakes('x = ' + ' + '.join(['a'] * 900), *[m.UndefinedName] * 900)
+
+    def test_callChain(self):
+        self.flakes('x = a' + '()' * 900, m.UndefinedName)
+
+    def test_subscriptChain(self):
+        self.flakes('x = a' + '[0]' * 900, m.UndefinedName)
+
+    def test_attributeChain(self):
+        self.flakes('x = a' + '.b' * 900, m.UndefinedName)
+
+    def test_methodCallChain(self):
+        self.flakes('x = a' + '.b()' * 900, m.UndefinedName)
+
+
+class TestTreeReuse(TestCase):
+    """
+    Checking a tree leaves it as it was, so that it can be checked again.
+    """
+
+    def test_reuse(self):
+        tree = ast.parse('''
+import os
+def f(x):
+    if x:
+        y = 1
+    else:
+        y = 2
+    continue
+''')
+        before = [sorted(vars(node)) for node in ast.walk(tree)]
+        first = checker.Checker(tree)
+        self.assertEqual([sorted(vars(node)) for node in ast.walk(tree)],
+                         before)
+        second = checker.Checker(tree)
+        self.assertEqual([str(message) for message in second.messages],
+                         [str(message) for message in first.messages])
+        self.assertEqual(len(first.messages), 3)
+
+
+class TestDifferentForks(TestCase):
+    """
+    Tests for L{checker.Checker.differentForks}.
+    """
+
+    def assertForks(self, source, expected):
+        """
+        Check C{source}, where names of the form C{xN} are bound, and assert
+        which pairs of them are on different forks.
+        """
+        tree = ast.parse(source)
+        names = {
+            node.id: node for node in ast.walk(tree)
+            if isinstance(node, ast.Name) and node.id.startswith('x')
+        }
+        for node in ast.walk(tree):
+            if isinstance(node, ast.MatchAs) and node.name:
+                names[node.name] = node
+        result = set()
+
+        class ForkChecker(checker.Checker):
+            # The nodes are only indexed until the dead scopes are checked
+            def checkDeadScopes(self):
+                result.update(
+                    (a, b) for a in names for b in names
+                    if a < b and self.differentForks(names[a], names[b]))
+                super().checkDeadScopes()
+
+        ForkChecker(tree)
+        self.assertEqual(result, expected)
+
+    def test_if(self):
+        self.assertForks('''
+if c:
+    x1 = 1
+    x2 = 1
+elif d:
+    x3 = 1
+else:
+    x4 = 1
+''', {
+            ('x1', 'x3'), ('x1', 'x4'), ('x2', 'x3'), ('x2', 'x4'),
+            ('x3', 'x4'),
+        })
+
+    def test_try(self):
+        self.assertForks('''
+try:
+    x1 = 1
+except A:
+    x2 = 1
+except B:
+    x3 = 1
+else:
+    x4 = 1
+finally:
+    x5 = 1
+''', {
+            ('x1', 'x2'), ('x1', 'x3'), ('x1', 'x5'), ('x2', 'x3'),
+            ('x2', 'x4'), ('x2', 'x5'), ('x3', 'x4'), ('x3', 'x5'),
+            ('x4', 'x5'),
+        })
+
+    def test_nested(self):
+        self.assertForks('''
+if c:
+    def f():
+        x1 = 1
+else:
+    while d:
+        x2 = 1
+''', {('x1', 'x2')})
+
+    @skipIf(version_info < (3, 10), "Python 3.10+")
+    def test_match(self):
+        self.assertForks('''
+match c:
+    case [x1]:
+        x2 = 1
+    case [x3]:
+        x4 = 1
+''', {('x1', 'x3'), ('x1', 'x4'), ('x2', 'x3'), ('x2', 'x4')})
+
+
+class TestCompactObjects(TestCase):
+    """
+    Bindings and messages have no instance dict, as there can be a lot of
+    them.  UndefinedLocal is the exception: it picks its message for each
+    instance, and is rare.
+    """
+
+    def test_bindings(self):
+        w = self.flakes('''
+        import os.path
+        from sys import argv as args
+        from re import *
+        __all__ = ['f']
+        def f(a):
+            b: int
+            c = a
+            if (d := c):
+                return d
+        class C:
+            pass
+        print(os, args)
+        ''', m.ImportStarUsed, m.UnusedAnnotation, m.UnusedImport)
+        bindings = [binding for scope in w.deadScopes
+                    for binding in scope.values()]
+        self.assertEqual(
+            {type(binding).__name__ for binding in bindings},
+            {'Builtin', 'SubmoduleImportation', 'ImportationFrom',
+             'StarImportation', 'ExportBinding', 'FunctionDefinition',
+             'ClassDefinition', 'Argument', 'Annotation', 'Assignment',
+             'NamedExprAssignment'})
+        for binding in bindings:
+            self.assertFalse(hasattr(binding, '__dict__'), binding)
+
+    def test_messages(self):
+        w = self.flakes('''
+        import os
+        undefined
+        ''', m.UnusedImport, m.UndefinedName)
+        for message in w.messages:
+            self.assertFalse(hasattr(message, '__dict__'), message)
+            self.assertTrue(message.message_args)
+
+    def test_undefinedLocal(self):
+        w = self.flakes('''
+        import os
+        def f():
+            os
+            os = 1
+            return os
+        ''', m.UndefinedLocal)
+        [message] = w.messages
+        self.assertTrue(hasattr(message, '__dict__'))
+        self.assertEqual(message.message_args, ('os', 2))
+
+    @skipIf(checker.PYPY, 'tracemalloc is CPython only')
+    def test_memory(self):
+        """
+        A binding takes less memory than the same binding with an instance
+        dict.
+        """
+        import tracemalloc
+        if tracemalloc.is_tracing():
+            self.skipTest('tracemalloc is already in use')
+
+        class DictAssignment(checker.Assignment):
+            pass
+
+        def size(cls, count=10000):
+            source = ast.Name('x', ast.Store())
+            tracemalloc.start()
+            try:
+                before = tracemalloc.get_traced_memory()[0]
+                bindings = [cls('x', source) for _ in range(count)]
+                after = tracemalloc.get_traced_memory()[0]
+            finally:
+                tracemalloc.stop()
+            return (after - before) / len(bindings)
+
+        self.assertLess(size(checker.Assignment), size(DictAssignment))
+
+
+class TestDeferredScopes(TestCase):
+    """
+    Deferred functions share the scope stack they were deferred with, and
+    names are resolved in the current stack only.
+    """
+
+    def test_shared(self):
+        stacks = []
+
+        class RecordingChecker(checker.Checker):
+            def deferFunction(self, callable):
+                stacks.append(self.scopeStack)
+                super().deferFunction(callable)
+
+        w = RecordingChecker(ast.parse('''
+def f():
+    g = lambda: x
+    return g
+h = lambda: f
+x = 1
+'''))
+        self.assertEqual(w.messages, [])
+        [module, lambda_, function] = stacks
+        self.assertIs(lambda_, module)
+        self.assertEqual(len(module), 1)
+        self.assertIs(function[0], module[0])
+        self.assertIsInstance(function[1], checker.FunctionScope)
+
+    def test_sameDepth(self):
+        """
+        Names are only resolved in the scopes of the current stack, though
+        other scopes at the same depth bound them.
+        """
+        self.flakes('''
+        def f():
+            x = 1
+            return x
+        def g():
+            return x
+        class C:
+            y = 1
+            def m(self):
+                return y
+            z = [y for _ in ()]
+        ''', m.UndefinedName, m.UndefinedName)
+
+    def test_deletedThenOuter(self):
+        """
+        A name deleted from an inner scope is looked up in the outer ones.
+        """
+        self.flakes('''
+        x = 1
+        class C:
+            x = 2
+            del x
+            y = x
+        ''')
@@ -5,6 +5,7 @@ Tests for behaviour related to type annotations.
 from sys import version_info
 
 from pyflakes import messages as m
+from pyflakes.checker import _parse_annotation
 from pyflakes.test.harness import TestCase, skipIf
 
 
@@ -515,6 +516,25 @@ class TestTypeAnnotations(TestCase):
         maybe_int = tsac('Maybe[int]', 42)
         """)
 
+    def test_quoted_type_cast_scopes(self):
+        """
+        Whether a call is a cast depends on the innermost binding of the
+        name, in the scope of the call.
+        """
+        self.flakes("""
+        def f():
+            from typing import cast as c
+            return c('Undefined1', 42)
+
+        def g(c):
+            return c('Undefined2', 42)
+
+        def h():
+            return c('Undefined3', 42)
+
+        from typing import cast as c
+        """, m.UndefinedName, m.UndefinedName)
+
     def test_quoted_TypeVar_constraints(self):
         self.flakes("""
         from typing import TypeVar, Optional
@@ -634,6 +654,53 @@ class TestTypeAnnotations(TestCase):
             class D: pass
         """)
 
+    def test_repeated_string_annotations(self):
+        """
+        Names in string annotations are reported at the string, each time
+        the annotation is used.
+        """
+        w = self.flakes("""
+        from typing import Optional
+        def f(a: "Optional[Undefined]") -> "Optional[Undefined]":
+            b: "Optional[Undefined]" = a
+            return b
+        """, m.UndefinedName, m.UndefinedName, m.UndefinedName)
+        self.assertEqual(
+            sorted((message.lineno, message.col) for message in w.messages),
+            [(3, 9), (3, 35), (4, 7)])
+
+    def test_repeated_unshared_string_annotations(self):
+        """
+        String annotations whose tree cannot be shared get a tree of their
+        own each time they are used, and the cache keeps none of them.
+        """
+        annotation = "Optional['Undefined']"
+        w = self.flakes(f"""
+        from typing import Optional
+        def f(a: "{annotation}") -> "{annotation}":
+            return a
+        """, m.UndefinedName, m.UndefinedName)
+        self.assertEqual(
+            sorted((message.lineno, message.col) for message in w.messages),
+            [(3, 9), (3, 37)])
+        self.assertEqual(_parse_annotation(annotation), ([], False))
+
+    def test_string_annotation_undefined_local(self):
+        """
+        A name loaded by a string annotation is reported at the string when
+        it is later assigned in the same scope.
+        """
+        w = self.flakes("""
+        x = 1
+        def f():
+            a: "x"
+            b: "(x := 3)"
+        """, m.UndefinedLocal, m.UnusedAnnotation, m.UnusedAnnotation,
+                        m.UnusedVariable)
+        [undefined] = [message for message in w.messages
+                       if isinstance(message, m.UndefinedLocal)]
+        self.assertEqual((undefined.lineno, undefined.col), (4, 7))
+
     def test_idomiatic_typing_guards(self):
         # typing.TYPE_CHECKING: python3.5.3+
         self.flakes("""
@@ -307,6 +307,26 @@ class Test(TestCase):
         def b(): fu; bar
         ''')
 
+    def test_definedByGlobalTwice(self):
+        """
+        A name can be declared global again after names were reported as
+        undefined, and only the earlier names are no longer reported.
+        """
+        self.flakes('''
+        def a(): fu
+        def b(): global fu; fu = 1
+        def c(): global fu; fu = 2
+        ''')
+        w = self.flakes('''
+        def a():
+            global fu
+        fu
+        def b(): fu; bar
+        ''', m.UnusedIndirectAssignment, m.UndefinedName)
+        [undefined] = [message for message in w.messages
+                       if isinstance(message, m.UndefinedName)]
+        self.assertEqual(undefined.message_args, ('bar',))
+
     def test_globalInGlobalScope(self):
         """
         A global statement in the global scope is ignored.